@@ -0,0 +1,160 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# benchmarks/bench_collector.py
+"""
+Benchmark the collection cycle of i2c.py on simulated I2C buses.
+Reports cycle latency percentiles, I2C transactions and bytes per cycle,
+CPU time per reading and upload payload size, as JSON.
+
+Run from the repository root
+    python3 -m benchmarks.bench_collector --output bench.json
+and compare with an older result
+    python3 -m benchmarks.bench_collector --compare bench.json
+"""
+
+import argparse, asyncio, json, logging, platform, subprocess, time
+from pathlib import Path
+
+from devices.simbus import SimBackend
+from helpers.collector import BusPoller, collectCycle, collectCycleAsync
+from helpers.lineprotocol import LineProtocolSerializer
+from helpers.sensors import createSensor
+
+
+# Nearest-rank percentile of sorted value list
+def getPercentile(sorted_list, percent):
+    if not sorted_list:
+        return 0.0
+    index = min(int(round(percent / 100 * (len(sorted_list) - 1))), len(sorted_list) - 1)
+    return sorted_list[index]
+
+
+def getGitRevision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+# Number of failed readings, where every measure is -1 as drivers report a failure
+def isFailed(result):
+    measures = result['measures']
+    return bool(measures) and all(value == -1 for value in measures.values())
+
+
+# Run cycles, and return the metrics dict.
+# Faults are injected only after initialization, so that they hit the cycles
+def runBenchmark(config, mode='bus', cycles=20, clock_hz=100000, latency_second=0.0, fault_rate=0.0):
+    backend = SimBackend.fromConfig(config, clock_hz=clock_hz, latency_second=latency_second)
+    sensor_list = []
+    for config_device in config['devices']:
+        sensor = createSensor(config_device, backend)
+        if sensor is not None:
+            sensor_list.append(sensor)
+    serializer = LineProtocolSerializer([sensor.name for sensor in sensor_list])
+
+    # Start measuring after initialization
+    for bus in backend.bus_list:
+        bus.resetCounters()
+        bus.fault_rate = fault_rate
+
+    poller = BusPoller(sensor_list) if mode == 'bus' else None
+    latency_list = []
+    payload_size = 0
+    reading_cnt = 0
+    failure_dict = {sensor.name: 0 for sensor in sensor_list}
+    cpu_start = time.process_time()
+    for _ in range(cycles):
+        start = time.perf_counter()
+        if mode == 'bus':
+            result_list = poller.collect()['results']
+        elif mode == 'asyncio':
+            result_list = asyncio.run(collectCycleAsync(sensor_list))['results']
+        else:
+            result_list = collectCycle(sensor_list)
+        latency_list.append(time.perf_counter() - start)
+        payload_size += len(serializer.serialize(result_list))
+        reading_cnt += len(result_list)
+        for result in result_list:
+            failure_dict[result['name']] += isFailed(result)
+    cpu_second = time.process_time() - cpu_start
+    if poller is not None:
+        poller.close()
+
+    latency_list.sort()
+    transaction_cnt = sum(bus.transaction_cnt for bus in backend.bus_list)
+    byte_cnt = sum(bus.byte_cnt for bus in backend.bus_list)
+    error_cnt = sum(bus.error_cnt for bus in backend.bus_list)
+    return {
+            'cycle_latency_ms': {
+                'p50': getPercentile(latency_list, 50) * 1000,
+                'p90': getPercentile(latency_list, 90) * 1000,
+                'p99': getPercentile(latency_list, 99) * 1000,
+                'max': latency_list[-1] * 1000,
+                },
+            'transactions_per_cycle': transaction_cnt / cycles,
+            'bytes_per_cycle': byte_cnt / cycles,
+            'bus_busy_ms_per_cycle': sum(bus.busy_second for bus in backend.bus_list) / cycles * 1000,
+            'bus_errors': error_cnt,
+            'failed_readings': failure_dict,
+            'cpu_us_per_reading': cpu_second / max(reading_cnt, 1) * 10**6,
+            'payload_bytes_per_cycle': payload_size / cycles,
+            'readings': reading_cnt,
+            }
+
+
+# Print relative change of each metric from an older result
+def compareResults(old, new, prefix=''):
+    for k, v in new.items():
+        if isinstance(v, dict):
+            compareResults(old.get(k, {}), v, prefix + k + '.')
+        elif isinstance(v, (int, float)) and isinstance(old.get(k), (int, float)):
+            change = (v - old[k]) / old[k] * 100 if old[k] else 0.0
+            print(f'{prefix + k:40s} {old[k]:12.3f} -> {v:12.3f} ({change:+.1f}%)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the collection cycle on simulated I2C buses.')
+    parser.add_argument('--config', default='config.json', help='Config file name')
+    parser.add_argument('--mode', default='bus', choices=['bus', 'asyncio', 'sequential'],
+            help='bus: BusPoller, asyncio: collectCycleAsync, sequential: collectCycle')
+    parser.add_argument('--cycles', type=int, default=20, help='Number of cycles')
+    parser.add_argument('--clock_hz', type=int, default=100000, help='Simulated I2C clock')
+    parser.add_argument('--latency_second', type=float, default=0.0, help='Simulated latency per transaction')
+    parser.add_argument('--fault_rate', type=float, default=0.0, help='Simulated fault rate per transaction')
+    parser.add_argument('--output', help='Write result JSON to this file')
+    parser.add_argument('--compare', help='Compare with result JSON of an older run')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    with open(args.config) as json_file:
+        config = json.load(json_file)
+
+    metrics = runBenchmark(config, args.mode, args.cycles,
+            args.clock_hz, args.latency_second, args.fault_rate)
+    result = {
+            'benchmark': 'collector',
+            'revision': getGitRevision(),
+            'python': platform.python_version(),
+            'parameters': {
+                'config': args.config, 'mode': args.mode, 'cycles': args.cycles,
+                'clock_hz': args.clock_hz, 'latency_second': args.latency_second,
+                'fault_rate': args.fault_rate,
+                },
+            'metrics': metrics,
+            }
+
+    result_json = json.dumps(result, indent=4)
+    print(result_json)
+    if args.output:
+        Path(args.output).write_text(result_json + '\n')
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text())
+        compareResults(old['metrics'], metrics)
+
+
+if __name__ == "__main__":
+    # execute only if run as a script
+    main()
@@ -3,7 +3,7 @@
 # devices/aht10.py
 
 from datetime import datetime
-import logging, time
+import asyncio, logging, time
 from pyi2c import I2CDevice, getBit
 
 
@@ -14,11 +14,13 @@ class AHT10:
     Accuracy: humidity +-2% (max +-3%), temperature +-0.3 C (max +- 0.4 C)
     Becarefull! one BUS for an AHT10 device! No other device should be connected to the same BUS!
     """
-    def __init__(self, bus_n=0, addr=0x38):
-        self._i2cdevice         = I2CDevice(bus_n, addr)
+    # i2cdevice can be any pyi2c.I2CDevice compatible object, such as a simulated device
+    def __init__(self, bus_n=0, addr=0x38, i2cdevice=None):
+        self._i2cdevice         = i2cdevice if i2cdevice is not None else I2CDevice(bus_n, addr)
         self._INIT_CMD          = 0xE1 # Initialization command
         self._SOFT_RESET        = 0xBA # Restart the sensor system
         self._TRIG_MEAS_LIST    = [0xAC, 0x33, 0x00] # Trigger measurement
+        self.MEAS_WAIT_SECOND   = .1 # Wait at least 75 ms after trigger measurement
         logging.info('AHT10 created.')
 
     def initialize(self):
@@ -44,21 +46,29 @@ class AHT10:
             is_ok = True
         return is_ok
 
-    def getHumidityTemperature(self):
+    def triggerMeasurement(self):
         # Write trigger measurement
         self._i2cdevice.write(self._TRIG_MEAS_LIST)
 
-        # Sleep at least 75 ms
-        time.sleep(.1) # .1 s
+    # Read raw bytes of the measurement: status, humidity and temperature.
+    # Return None when the read failed
+    def readRaw(self):
+        read_data = self._i2cdevice.read(6)
 
+        # Check i2c status code is success
+        if self._i2cdevice.status_code.value != 0:
+            return None
+        return read_data
+
+    def readHumidityTemperature(self):
         # Read 6 bytes of data
-        read_data = self._i2cdevice.read(6)
+        read_data = self.readRaw()
 
         # Prepare variables
         humidity = temperature = -1
 
-        # Check i2c status code is success
-        if self._i2cdevice.status_code.value == 0:
+        # Check read is success
+        if read_data is not None:
 
             # Treat status code
             status = read_data[0]
@@ -84,6 +94,24 @@ class AHT10:
 
         return humidity, temperature
 
+    def getHumidityTemperature(self):
+        self.triggerMeasurement()
+
+        # Sleep at least 75 ms
+        time.sleep(self.MEAS_WAIT_SECOND)
+
+        return self.readHumidityTemperature()
+
+    async def getHumidityTemperatureAsync(self):
+        self.triggerMeasurement()
+
+        # Sleep at least 75 ms, without blocking the event loop
+        await asyncio.sleep(self.MEAS_WAIT_SECOND)
+
+        # On a bad status, the device is recovered with time.sleep,
+        # so the read runs on a worker thread, not to block the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.readHumidityTemperature)
+
 
 # Test main
 def main():
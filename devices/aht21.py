@@ -3,7 +3,7 @@
 # devices/aht21.py
 
 from datetime import datetime
-import logging, time
+import asyncio, logging, time
 from pyi2c import I2CDevice, getBit
 
 
@@ -13,11 +13,13 @@ class AHT21:
     Address is 0x38
     Accuracy: humidity +-2% (max +-3%), temperature +-0.3 C (max +- 0.5 C)
     """
-    def __init__(self, bus_n=0, addr=0x38):
-        self._i2cdevice         = I2CDevice(bus_n, addr)
+    # i2cdevice can be any pyi2c.I2CDevice compatible object, such as a simulated device
+    def __init__(self, bus_n=0, addr=0x38, i2cdevice=None):
+        self._i2cdevice         = i2cdevice if i2cdevice is not None else I2CDevice(bus_n, addr)
         self._INIT_CMD_LIST     = [0x1B, 0x1C, 0x1E]
         self._GET_STATUS        = 0x71 # to get a Status word
         self._TRIG_MEAS_LIST    = [0xAC, 0x33, 0x00] # Trigger measurement. need to wait at least 80 ms
+        self.MEAS_WAIT_SECOND   = .1 # Wait after trigger measurement
 
         logging.info('AHT21 created.')
 
@@ -41,22 +43,30 @@ class AHT21:
             is_ok = True
         return is_ok
 
-    def getHumidityTemperature(self):
+    def triggerMeasurement(self):
         # Write trigger measurement
         self._i2cdevice.write(self._TRIG_MEAS_LIST)
 
-        # Sleep at least 80 ms
-        time.sleep(.1) # .1 s
+    # Read raw bytes of the measurement: status, humidity and temperature.
+    # Return None when the read failed
+    def readRaw(self):
+        read_data = self._i2cdevice.read(7)
 
+        # Check i2c status code is success
+        if self._i2cdevice.status_code.value != 0:
+            return None
+        return read_data
+
+    def readHumidityTemperature(self):
         # read 6 bytes of data
-        read_data = self._i2cdevice.read(7)
+        read_data = self.readRaw()
         #print(read_data)
 
         # Prepare variables
         humidity = temperature = -1
 
-        # Check i2c status code is success
-        if self._i2cdevice.status_code.value == 0:
+        # Check read is success
+        if read_data is not None:
 
             # Treat status code
             status = read_data[0]
@@ -82,6 +92,24 @@ class AHT21:
 
         return humidity, temperature
 
+    def getHumidityTemperature(self):
+        self.triggerMeasurement()
+
+        # Sleep at least 80 ms
+        time.sleep(self.MEAS_WAIT_SECOND)
+
+        return self.readHumidityTemperature()
+
+    async def getHumidityTemperatureAsync(self):
+        self.triggerMeasurement()
+
+        # Sleep at least 80 ms, without blocking the event loop
+        await asyncio.sleep(self.MEAS_WAIT_SECOND)
+
+        # On a bad status, the device is recovered with time.sleep,
+        # so the read runs on a worker thread, not to block the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.readHumidityTemperature)
+
 
 # Test main
 def main():
@@ -0,0 +1,214 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# devices/bme680_batch.py
+"""
+BME680 compensation of many raw samples at once, with NumPy.
+Same integer arithmetic as BME680._calc_* of devices/bme680_example.py,
+so results are exactly the same as the driver's .data, without touching calibration_data.t_fine.
+Integer math is in int64, and rows where it could overflow are computed again with Python ints.
+"""
+
+import numpy as np
+
+from . import constants
+
+
+_LOOKUP_TABLE1 = np.array(constants.lookupTable1, dtype=np.int64)
+_LOOKUP_TABLE2 = np.array(constants.lookupTable2, dtype=np.int64)
+
+
+# Raw ADC values from field data blocks of FIELD_LENGTH bytes read at FIELD0_ADDR,
+# as an array of shape (N, FIELD_LENGTH)
+def parseFieldData(regs):
+    regs = np.asarray(regs, dtype=np.int64).reshape(-1, constants.FIELD_LENGTH)
+    return {
+            'status': regs[:, 0],
+            'adc_pres': (regs[:, 2] << 12) | (regs[:, 3] << 4) | (regs[:, 4] >> 4),
+            'adc_temp': (regs[:, 5] << 12) | (regs[:, 6] << 4) | (regs[:, 7] >> 4),
+            'adc_hum': (regs[:, 8] << 8) | regs[:, 9],
+            'adc_gas_res_low': (regs[:, 13] << 2) | (regs[:, 14] >> 6),
+            'adc_gas_res_high': (regs[:, 15] << 2) | (regs[:, 16] >> 6),
+            'gas_range_l': regs[:, 14] & constants.GAS_RANGE_MSK,
+            'gas_range_h': regs[:, 16] & constants.GAS_RANGE_MSK,
+            }
+
+
+# -------------------------
+# Integer math of the formulas.
+# Math64 checks every product and left shift of int64 arrays in float64 beforehand,
+# and marks rows where a value could reach OVERFLOW_LIMIT.
+# Those rows are computed again by the same formulas with PythonIntMath, on arrays of Python ints,
+# so results stay exactly the driver's whatever the calibration is.
+# The limit leaves room for the sums of a few such values in int64
+OVERFLOW_LIMIT = 2.0**60
+
+
+class Math64:
+    def __init__(self, shape):
+        self.overflow = np.zeros(shape, dtype=bool)
+
+    def _check(self, magnitude):
+        self.overflow |= magnitude >= OVERFLOW_LIMIT
+
+    def mul(self, a, b):
+        self._check(np.abs(np.asarray(a, dtype=np.float64) * np.asarray(b, dtype=np.float64)))
+        return a * b
+
+    def shl(self, a, bit_cnt):
+        self._check(np.abs(np.asarray(a, dtype=np.float64)) * 2.0**bit_cnt)
+        return a << bit_cnt
+
+    # Raise as Python int does, only for rows which did not overflow
+    def checkDivisor(self, b):
+        if np.any((b == 0) & ~self.overflow):
+            raise ZeroDivisionError('integer division or modulo by zero')
+
+
+class PythonIntMath:
+    @staticmethod
+    def mul(a, b):
+        return a * b
+
+    @staticmethod
+    def shl(a, bit_cnt):
+        return a << bit_cnt
+
+    @staticmethod
+    def checkDivisor(b):
+        if np.any(b == 0):
+            raise ZeroDivisionError('integer division or modulo by zero')
+
+
+# Run formula on arrays in int64, and rows that could overflow again on Python ints.
+# The result is int64, or object of Python ints when there were such rows
+def _runExact(formula, calibration_data, *array_list):
+    array_list = [a if a.dtype == object else a.astype(np.int64) for a in
+            np.broadcast_arrays(*[np.asarray(a) for a in array_list])]
+    math = Math64(array_list[0].shape)
+    # Values of overflowing rows are thrown away, so are their warnings
+    with np.errstate(all='ignore'):
+        result = formula(calibration_data, math, *array_list)
+    if math.overflow.any():
+        rows = math.overflow
+        result = np.asarray(result).astype(object)
+        result[rows] = formula(calibration_data, PythonIntMath, *[a[rows].astype(object) for a in array_list])
+    return result
+
+
+def _temperature(cal, math, temperature_adc, offset_temp_in_t_fine):
+    var1 = (temperature_adc >> 3) - (cal.par_t1 << 1)
+    var2 = math.mul(var1, cal.par_t2) >> 11
+    var3 = math.mul(var1 >> 1, var1 >> 1) >> 12
+    var3 = math.mul(var3, cal.par_t3 << 4) >> 14
+    return (var2 + var3) + offset_temp_in_t_fine
+
+
+def _pressure(cal, math, pressure_adc, t_fine):
+    var1 = (t_fine >> 1) - 64000
+    var2 = math.mul(math.mul(var1 >> 2, var1 >> 2) >> 11, cal.par_p6) >> 2
+    var2 = var2 + math.shl(math.mul(var1, cal.par_p5), 1)
+    var2 = (var2 >> 2) + (cal.par_p4 << 16)
+    var1 = (math.mul(math.mul(var1 >> 2, var1 >> 2) >> 13, cal.par_p3 << 5) >> 3) + (math.mul(cal.par_p2, var1) >> 1)
+    var1 = var1 >> 18
+
+    var1 = math.mul(32768 + var1, cal.par_p1) >> 15
+    math.checkDivisor(var1)
+    calc_pressure = 1048576 - pressure_adc
+    calc_pressure = math.mul(calc_pressure - (var2 >> 12), 3125)
+
+    is_large = calc_pressure >= (1 << 31)
+    calc_pressure = np.where(is_large,
+            (calc_pressure // var1) << 1,
+            math.shl(np.where(is_large, 0, calc_pressure), 1) // var1)
+
+    var1 = math.mul(cal.par_p9, math.mul(calc_pressure >> 3, calc_pressure >> 3) >> 13) >> 12
+    var2 = math.mul(calc_pressure >> 2, cal.par_p8) >> 13
+    var3 = math.mul(math.mul(math.mul(calc_pressure >> 8, calc_pressure >> 8), calc_pressure >> 8), cal.par_p10) >> 17
+
+    return calc_pressure + ((var1 + var2 + var3 + (cal.par_p7 << 7)) >> 4)
+
+
+def _humidity(cal, math, humidity_adc, t_fine):
+    temp_scaled = (math.mul(t_fine, 5) + 128) >> 8
+    var1 = (humidity_adc - (cal.par_h1 * 16)) - ((math.mul(temp_scaled, cal.par_h3) // 100) >> 1)
+    var2 = math.mul(cal.par_h2,
+            (math.mul(temp_scaled, cal.par_h4) // 100) +
+            ((math.mul(temp_scaled, math.mul(temp_scaled, cal.par_h5) // 100) >> 6) // 100) + (1 * 16384)) >> 10
+    var3 = math.mul(var1, var2)
+    var4 = cal.par_h6 << 7
+    var4 = (var4 + (math.mul(temp_scaled, cal.par_h7) // 100)) >> 4
+    var5 = math.mul(var3 >> 14, var3 >> 14) >> 10
+    var6 = math.mul(var4, var5) >> 1
+    return math.mul((var3 + var6) >> 10, 1000) >> 12
+
+
+# Returns (temperature in 1/100 degree, t_fine)
+def calcTemperature(calibration_data, temperature_adc, offset_temp_in_t_fine=0):
+    t_fine = _runExact(_temperature, calibration_data, temperature_adc, offset_temp_in_t_fine)
+    return _runExact(lambda cal, math, t_fine: (math.mul(t_fine, 5) + 128) >> 8, calibration_data, t_fine), t_fine
+
+
+# Pressure in Pa
+def calcPressure(calibration_data, pressure_adc, t_fine):
+    return _runExact(_pressure, calibration_data, pressure_adc, t_fine)
+
+
+# Humidity in 1/1000 %RH
+def calcHumidity(calibration_data, humidity_adc, t_fine):
+    calc_hum = _runExact(_humidity, calibration_data, humidity_adc, t_fine)
+    return np.clip(calc_hum, 0, 100000)
+
+
+# Gas resistance in Ohm of the low variant
+def calcGasResistanceLow(calibration_data, gas_res_adc, gas_range):
+    gas_res_adc = np.asarray(gas_res_adc, dtype=np.int64)
+    gas_range = np.asarray(gas_range, dtype=np.int64)
+    var1 = ((1340 + (5 * calibration_data.range_sw_err)) * _LOOKUP_TABLE1[gas_range]) >> 16
+    var2 = ((gas_res_adc << 15) - 16777216) + var1
+    if np.any(var2 == 0):
+        raise ZeroDivisionError('division by zero')
+    var3 = (_LOOKUP_TABLE2[gas_range] * var1) >> 9
+    # Both operands are below 2**53, so they are exact in float64, as int / int of Python
+    calc_gas_res = (var3 + (var2 >> 1)) / var2
+
+    return np.where(calc_gas_res < 0, (1 << 32) + calc_gas_res, calc_gas_res)
+
+
+# Gas resistance in Ohm of the high variant
+def calcGasResistanceHigh(gas_res_adc, gas_range):
+    gas_res_adc = np.asarray(gas_res_adc, dtype=np.int64)
+    gas_range = np.asarray(gas_range, dtype=np.int64)
+    var1 = 262144 >> gas_range
+    var2 = 4096 + (gas_res_adc - 512) * 3
+
+    return (10000 * var1) / var2 * 100
+
+
+# Compensate arrays of raw ADC values, as from parseFieldData.
+# Returns arrays of the same values as BME680.data:
+# temperature in degree, pressure in hPa, humidity in %RH and gas resistance in Ohm
+def compensate(calibration_data, adc_temp, adc_pres, adc_hum, adc_gas_res, gas_range,
+        variant=constants.VARIANT_LOW, offset_temp_in_t_fine=0):
+    temperature, t_fine = calcTemperature(calibration_data, adc_temp, offset_temp_in_t_fine)
+    if variant == constants.VARIANT_HIGH:
+        gas_resistance = calcGasResistanceHigh(adc_gas_res, gas_range)
+    else:
+        gas_resistance = calcGasResistanceLow(calibration_data, adc_gas_res, gas_range)
+    # Rows computed on Python ints are divided as Python ints, then are float64 as others
+    return {
+            'temperature': np.asarray(temperature / 100.0, dtype=np.float64),
+            'pressure': np.asarray(calcPressure(calibration_data, adc_pres, t_fine) / 100.0, dtype=np.float64),
+            'humidity': np.asarray(calcHumidity(calibration_data, adc_hum, t_fine) / 1000.0, dtype=np.float64),
+            'gas_resistance': gas_resistance,
+            }
+
+
+# Compensate field data blocks, the gas ADC of the variant is chosen
+def compensateFieldData(calibration_data, regs, variant=constants.VARIANT_LOW, offset_temp_in_t_fine=0):
+    field = parseFieldData(regs)
+    if variant == constants.VARIANT_HIGH:
+        adc_gas_res, gas_range = field['adc_gas_res_high'], field['gas_range_h']
+    else:
+        adc_gas_res, gas_range = field['adc_gas_res_low'], field['gas_range_l']
+    return compensate(calibration_data, field['adc_temp'], field['adc_pres'], field['adc_hum'],
+            adc_gas_res, gas_range, variant, offset_temp_in_t_fine)
@@ -2,6 +2,7 @@
 from .constants import lookupTable1, lookupTable2
 from .constants import BME680Data
 from . import constants
+import asyncio
 import math
 import time
 
@@ -17,6 +18,74 @@ if hasattr(constants, '__dict__'):
             globals()[key] = value
 
 
+class SMBusTransport:
+    """Register access through an smbus.SMBus compatible instance.
+
+    Each call is one I2C transaction, SMBus block transfers are up to 32 bytes.
+
+    """
+
+    def __init__(self, i2c_device, i2c_addr):  # noqa D107
+        self._i2c = i2c_device
+        self.i2c_addr = i2c_addr
+
+    def read_byte(self, register):
+        """Read one register."""
+        return self._i2c.read_byte_data(self.i2c_addr, register)
+
+    def read_block(self, register, length):
+        """Read length registers from register, as a list."""
+        return self._i2c.read_i2c_block_data(self.i2c_addr, register, length)
+
+    def write_byte(self, register, value):
+        """Write one register."""
+        self._i2c.write_byte_data(self.i2c_addr, register, value)
+
+    def write_block(self, register, data):
+        """Write register followed by data in one transaction."""
+        self._i2c.write_i2c_block_data(self.i2c_addr, register, data)
+
+
+class I2CRdwrTransport(SMBusTransport):
+    """Register access through combined write/read transactions of smbus2 i2c_rdwr.
+
+    The register address is written and the data is read back with a repeated start,
+    in one transaction without the 32 bytes limit of SMBus block transfers.
+
+    """
+
+    def __init__(self, i2c_device, i2c_addr):  # noqa D107
+        SMBusTransport.__init__(self, i2c_device, i2c_addr)
+        from smbus2 import i2c_msg
+        self._i2c_msg = i2c_msg
+
+    def read_byte(self, register):
+        """Read one register."""
+        return self.read_block(register, 1)[0]
+
+    def read_block(self, register, length):
+        """Read length registers from register, as a list."""
+        write = self._i2c_msg.write(self.i2c_addr, [register])
+        read = self._i2c_msg.read(self.i2c_addr, length)
+        self._i2c.i2c_rdwr(write, read)
+        return list(read)
+
+    def write_byte(self, register, value):
+        """Write one register."""
+        self.write_block(register, [value])
+
+    def write_block(self, register, data):
+        """Write register followed by data in one transaction."""
+        self._i2c.i2c_rdwr(self._i2c_msg.write(self.i2c_addr, [register] + list(data)))
+
+
+def get_transport(i2c_device, i2c_addr):
+    """Get I2CRdwrTransport when i2c_device supports i2c_rdwr, as smbus2.SMBus, or SMBusTransport."""
+    if hasattr(i2c_device, 'i2c_rdwr'):
+        return I2CRdwrTransport(i2c_device, i2c_addr)
+    return SMBusTransport(i2c_device, i2c_addr)
+
+
 class BME680(BME680Data):
     """BOSCH BME680.
 
@@ -24,14 +93,22 @@ class BME680(BME680Data):
 
     :param i2c_addr: One of I2C_ADDR_PRIMARY (0x76) or I2C_ADDR_SECONDARY (0x77)
     :param i2c_device: Optional smbus or compatible instance for facilitating i2c communications.
+    :param transport: Optional SMBusTransport compatible instance, chosen by get_transport by default.
+    :param settings: Optional dict of configure() arguments, see configure().
 
     """
 
-    def __init__(self, i2c_addr=constants.I2C_ADDR_PRIMARY, i2c_device=None):
+    def __init__(self, i2c_addr=constants.I2C_ADDR_PRIMARY, i2c_device=None, transport=None, settings=None):
         """Initialise BME680 sensor instance and verify device presence.
 
+        Without settings, the device is reset and configured with default settings one by one.
+        With settings, the device is reset and configured only when it does not hold
+        the settings already, see is_warm_start.
+
         :param i2c_addr: i2c address of BME680
         :param i2c_device: Optional SMBus-compatible instance for i2c transport
+        :param transport: Optional register access of i2c_device
+        :param settings: Optional dict of configure() arguments
 
         """
         BME680Data.__init__(self)
@@ -41,6 +118,10 @@ class BME680(BME680Data):
         if self._i2c is None:
             import smbus
             self._i2c = smbus.SMBus(1)
+        self._transport = transport if transport is not None else get_transport(self._i2c, self.i2c_addr)
+
+        # Shadow copy of the configuration registers, {register: value}
+        self._shadow_regs = {}
 
         try:
             self.chip_id = self._get_regs(constants.CHIP_ID_ADDR, 1)
@@ -51,6 +132,15 @@ class BME680(BME680Data):
 
         self._variant = self._get_regs(constants.CHIP_VARIANT_ADDR, 1)
 
+        # True when the device already held the settings, so reset and configuration were skipped
+        self.is_warm_start = False
+
+        if settings is not None:
+            self._get_calibration_data()
+            self.set_temp_offset(0)
+            self.is_warm_start = not self.configure(**settings)
+            return
+
         self.soft_reset()
         self.set_power_mode(constants.SLEEP_MODE)
 
@@ -72,9 +162,11 @@ class BME680(BME680Data):
         calibration = self._get_regs(constants.COEFF_ADDR1, constants.COEFF_ADDR1_LEN)
         calibration += self._get_regs(constants.COEFF_ADDR2, constants.COEFF_ADDR2_LEN)
 
-        heat_range = self._get_regs(constants.ADDR_RES_HEAT_RANGE_ADDR, 1)
-        heat_value = constants.twos_comp(self._get_regs(constants.ADDR_RES_HEAT_VAL_ADDR, 1), bits=8)
-        sw_error = constants.twos_comp(self._get_regs(constants.ADDR_RANGE_SW_ERR_ADDR, 1), bits=8)
+        # Heater range, heater value and switching error are in one block from 0x00
+        regs = self._get_regs(constants.ADDR_RES_HEAT_VAL_ADDR, constants.ADDR_RANGE_SW_ERR_ADDR + 1)
+        heat_range = regs[constants.ADDR_RES_HEAT_RANGE_ADDR]
+        heat_value = constants.twos_comp(regs[constants.ADDR_RES_HEAT_VAL_ADDR], bits=8)
+        sw_error = constants.twos_comp(regs[constants.ADDR_RANGE_SW_ERR_ADDR], bits=8)
 
         self.calibration_data.set_from_array(calibration)
         self.calibration_data.set_other(heat_range, heat_value, sw_error)
@@ -83,6 +175,93 @@ class BME680(BME680Data):
         """Trigger a soft reset."""
         self._set_regs(constants.SOFT_RESET_ADDR, constants.SOFT_RESET_CMD)
         time.sleep(constants.RESET_PERIOD / 1000.0)
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """Drop the shadow copy of the configuration registers.
+
+        The next read of each configuration register goes to the device again.
+        Call this when the device may have been configured by someone else.
+
+        """
+        self._shadow_regs = {}
+
+    def configure(self, os_hum=constants.OS_2X, os_pres=constants.OS_4X, os_temp=constants.OS_8X,
+                  filter_size=constants.FILTER_SIZE_3, gas_status=constants.ENABLE_GAS_MEAS,
+                  heater_temperature=320, heater_duration=150, nb_profile=0):
+        """Apply all measurement settings at once.
+
+        The configuration registers are read in one block. When they differ from the settings,
+        the device is reset and the heater and control registers (0x70 to 0x75) are written
+        in one transaction of (register, value) pairs.
+        Calibration data has to be read before.
+
+        Returns True when the device was configured, False when it held the settings already.
+
+        """
+        pair_list = self._get_config_pairs(os_hum, os_pres, os_temp, filter_size,
+                                           gas_status, heater_temperature, heater_duration, nb_profile)
+
+        regs = self._get_regs(constants.SHADOW_REG_FIRST, constants.SHADOW_REG_LAST - constants.SHADOW_REG_FIRST + 1)
+        is_configured = True
+        for register, value in pair_list:
+            current = regs[register - constants.SHADOW_REG_FIRST]
+            if register == constants.CONF_T_P_MODE_ADDR:
+                current &= ~constants.MODE_MSK
+            if current != value:
+                is_configured = False
+                break
+
+        if is_configured:
+            for index, value in enumerate(regs):
+                self._set_shadow_reg(constants.SHADOW_REG_FIRST + index, value)
+            return False
+
+        self.soft_reset()
+        self._set_pairs(pair_list)
+        return True
+
+    def _get_config_pairs(self, os_hum, os_pres, os_temp, filter_size,
+                          gas_status, heater_temperature, heater_duration, nb_profile):
+        """Get (register, value) pairs of the settings, and store them in .tph_settings and .gas_settings.
+
+        Register bits which are not settings, such as SPI 3 wire mode, are 0 as after reset.
+
+        """
+        if nb_profile > constants.NBCONV_MAX or nb_profile < constants.NBCONV_MIN:
+            raise ValueError("Profile '{}' should be between {} and {}".format(nb_profile, constants.NBCONV_MIN, constants.NBCONV_MAX))
+        if gas_status == -1:
+            if self._variant == constants.VARIANT_HIGH:
+                gas_status = constants.ENABLE_GAS_MEAS_HIGH
+            else:
+                gas_status = constants.ENABLE_GAS_MEAS_LOW
+
+        self.tph_settings.os_hum = os_hum
+        self.tph_settings.os_pres = os_pres
+        self.tph_settings.os_temp = os_temp
+        self.tph_settings.filter = filter_size
+        self.gas_settings.run_gas = gas_status
+        self.gas_settings.nb_conv = nb_profile
+        self.gas_settings.heater = constants.ENABLE_HEATER
+        self.gas_settings.heatr_temp = heater_temperature
+        self.gas_settings.heatr_dur = heater_duration
+
+        # Heater resistance depends on the ambient temperature,
+        # which is taken as 25 degree before the first measurement, so that the value is reproducible
+        if self.ambient_temperature is None:
+            self.ambient_temperature = 2500
+
+        return [
+            (constants.RES_HEAT0_ADDR + nb_profile, int(self._calc_heater_resistance(heater_temperature))),
+            (constants.GAS_WAIT0_ADDR + nb_profile, self._calc_heater_duration(heater_duration)),
+            (constants.CONF_HEAT_CTRL_ADDR, constants.ENABLE_HEATER << constants.HCTRL_POS),
+            (constants.CONF_ODR_RUN_GAS_NBC_ADDR,
+                (gas_status << constants.RUN_GAS_POS) | (nb_profile << constants.NBCONV_POS)),
+            (constants.CONF_OS_H_ADDR, os_hum << constants.OSH_POS),
+            (constants.CONF_T_P_MODE_ADDR,
+                (os_temp << constants.OST_POS) | (os_pres << constants.OSP_POS) | (constants.SLEEP_MODE << constants.MODE_POS)),
+            (constants.CONF_ODR_FILT_ADDR, filter_size << constants.FILTER_POS),
+        ]
 
     def set_temp_offset(self, value):
         """Set temperature offset in celsius.
@@ -113,7 +292,7 @@ class BME680(BME680Data):
 
     def get_humidity_oversample(self):
         """Get humidity oversampling."""
-        return (self._get_regs(constants.CONF_OS_H_ADDR, 1) & constants.OSH_MSK) >> constants.OSH_POS
+        return (self._get_shadow_reg(constants.CONF_OS_H_ADDR) & constants.OSH_MSK) >> constants.OSH_POS
 
     def set_pressure_oversample(self, value):
         """Set temperature oversampling.
@@ -132,7 +311,7 @@ class BME680(BME680Data):
 
     def get_pressure_oversample(self):
         """Get pressure oversampling."""
-        return (self._get_regs(constants.CONF_T_P_MODE_ADDR, 1) & constants.OSP_MSK) >> constants.OSP_POS
+        return (self._get_shadow_reg(constants.CONF_T_P_MODE_ADDR) & constants.OSP_MSK) >> constants.OSP_POS
 
     def set_temperature_oversample(self, value):
         """Set pressure oversampling.
@@ -151,7 +330,7 @@ class BME680(BME680Data):
 
     def get_temperature_oversample(self):
         """Get temperature oversampling."""
-        return (self._get_regs(constants.CONF_T_P_MODE_ADDR, 1) & constants.OST_MSK) >> constants.OST_POS
+        return (self._get_shadow_reg(constants.CONF_T_P_MODE_ADDR) & constants.OST_MSK) >> constants.OST_POS
 
     def set_filter(self, value):
         """Set IIR filter size.
@@ -171,7 +350,7 @@ class BME680(BME680Data):
 
     def get_filter(self):
         """Get filter size."""
-        return (self._get_regs(constants.CONF_ODR_FILT_ADDR, 1) & constants.FILTER_MSK) >> constants.FILTER_POS
+        return (self._get_shadow_reg(constants.CONF_ODR_FILT_ADDR) & constants.FILTER_MSK) >> constants.FILTER_POS
 
     def select_gas_heater_profile(self, value):
         """Set current gas sensor conversion profile.
@@ -189,7 +368,7 @@ class BME680(BME680Data):
 
     def get_gas_heater_profile(self):
         """Get gas sensor conversion profile: 0 to 9."""
-        return self._get_regs(constants.CONF_ODR_RUN_GAS_NBC_ADDR, 1) & constants.NBCONV_MSK
+        return self._get_shadow_reg(constants.CONF_ODR_RUN_GAS_NBC_ADDR) & constants.NBCONV_MSK
 
     def set_gas_heater_status(self, value):
         """Enable/disable gas heater."""
@@ -198,7 +377,7 @@ class BME680(BME680Data):
 
     def get_gas_heater_status(self):
         """Get current heater status."""
-        return (self._get_regs(constants.CONF_HEAT_CTRL_ADDR, 1) & constants.HCTRL_MSK) >> constants.HCTRL_POS
+        return (self._get_shadow_reg(constants.CONF_HEAT_CTRL_ADDR) & constants.HCTRL_MSK) >> constants.HCTRL_POS
 
     def set_gas_status(self, value):
         """Enable/disable gas sensor."""
@@ -212,7 +391,7 @@ class BME680(BME680Data):
 
     def get_gas_status(self):
         """Get the current gas status."""
-        return (self._get_regs(constants.CONF_ODR_RUN_GAS_NBC_ADDR, 1) & constants.RUN_GAS_MSK) >> constants.RUN_GAS_POS
+        return (self._get_shadow_reg(constants.CONF_ODR_RUN_GAS_NBC_ADDR) & constants.RUN_GAS_MSK) >> constants.RUN_GAS_POS
 
     def set_gas_heater_profile(self, temperature, duration, nb_profile=0):
         """Set temperature and duration of gas sensor heater.
@@ -269,72 +448,166 @@ class BME680(BME680Data):
 
         self._set_bits(constants.CONF_T_P_MODE_ADDR, constants.MODE_MSK, constants.MODE_POS, value)
 
-        while blocking and self.get_power_mode() != self.power_mode:
+        # Forced mode goes back to sleep by itself when the measurement is finished,
+        # so only waiting for sleep mode makes sense
+        while blocking and value == constants.SLEEP_MODE and self.get_power_mode() != value:
             time.sleep(constants.POLL_PERIOD_MS / 1000.0)
 
     def get_power_mode(self):
-        """Get power mode."""
-        self.power_mode = self._get_regs(constants.CONF_T_P_MODE_ADDR, 1)
+        """Get power mode.
+
+        The mode bits change without a write, so they are always read from the device.
+
+        """
+        self.power_mode = (self._get_regs(constants.CONF_T_P_MODE_ADDR, 1) & constants.MODE_MSK) >> constants.MODE_POS
         return self.power_mode
 
     def get_sensor_data(self):
         """Get sensor data.
 
+        Sleeps once for the computed measurement duration, then collects.
         Stores data in .data and returns True upon success.
 
+        """
+        self.trigger_measurement()
+        time.sleep(self.get_measurement_wait())
+        return self.collect_sensor_data()
+
+    async def get_sensor_data_async(self):
+        """Get sensor data, waiting with asyncio.sleep instead of time.sleep.
+
+        Stores data in .data and returns True upon success.
+
+        """
+        self.trigger_measurement()
+        await asyncio.sleep(self.get_measurement_wait())
+        return await self.collect_sensor_data_async()
+
+    def trigger_measurement(self):
+        """Start a forced mode measurement without waiting for its result.
+
+        Call collect_sensor_data once get_measurement_wait() seconds have passed.
+
         """
         self.set_power_mode(constants.FORCED_MODE)
 
-        for attempt in range(10):
-            status = self._get_regs(constants.FIELD0_ADDR, 1)
+    def get_measurement_wait(self):
+        """Get the time in seconds between trigger and a finished measurement.
 
-            if (status & constants.NEW_DATA_MSK) == 0:
-                time.sleep(constants.POLL_PERIOD_MS / 1000.0)
-                continue
+        TPHG duration of the BME68x datasheet, computed from the oversampling settings,
+        plus the heater duration when gas measurement is enabled.
+        The IIR filter does not add to the conversion time.
 
-            regs = self._get_regs(constants.FIELD0_ADDR, constants.FIELD_LENGTH)
+        """
+        meas_cycles = constants.OS_TO_MEAS_CYCLES[self.tph_settings.os_temp]
+        meas_cycles += constants.OS_TO_MEAS_CYCLES[self.tph_settings.os_pres]
+        meas_cycles += constants.OS_TO_MEAS_CYCLES[self.tph_settings.os_hum]
 
-            self.data.status = regs[0] & constants.NEW_DATA_MSK
-            # Contains the nb_profile used to obtain the current measurement
-            self.data.gas_index = regs[0] & constants.GAS_INDEX_MSK
-            self.data.meas_index = regs[1]
+        # TPH measurement, TPH switching, gas measurement and rounding in micro second
+        meas_us = meas_cycles * 1963 + 477 * 4 + 477 * 5 + 500
+        # Wake up duration of 1 ms
+        meas_ms = meas_us // 1000 + 1
 
-            adc_pres = (regs[2] << 12) | (regs[3] << 4) | (regs[4] >> 4)
-            adc_temp = (regs[5] << 12) | (regs[6] << 4) | (regs[7] >> 4)
-            adc_hum = (regs[8] << 8) | regs[9]
-            adc_gas_res_low = (regs[13] << 2) | (regs[14] >> 6)
-            adc_gas_res_high = (regs[15] << 2) | (regs[16] >> 6)
-            gas_range_l = regs[14] & constants.GAS_RANGE_MSK
-            gas_range_h = regs[16] & constants.GAS_RANGE_MSK
+        if self.gas_settings.run_gas and self.gas_settings.heatr_dur:
+            meas_ms += self.gas_settings.heatr_dur
+        return meas_ms / 1000.0
 
-            if self._variant == constants.VARIANT_HIGH:
-                self.data.status |= regs[16] & constants.GASM_VALID_MSK
-                self.data.status |= regs[16] & constants.HEAT_STAB_MSK
-            else:
-                self.data.status |= regs[14] & constants.GASM_VALID_MSK
-                self.data.status |= regs[14] & constants.HEAT_STAB_MSK
+    def collect_sensor_data(self):
+        """Collect the result of a triggered measurement.
 
-            self.data.heat_stable = (self.data.status & constants.HEAT_STAB_MSK) > 0
+        Call it get_measurement_wait() seconds after the trigger, so that the first read
+        finds the measurement finished. Polling is only a fallback for a slow device.
+        Stores data in .data and returns True upon success.
 
-            temperature = self._calc_temperature(adc_temp)
-            self.data.temperature = temperature / 100.0
-            self.ambient_temperature = temperature  # Saved for heater calc
+        """
+        regs = self.collect_raw_data()
+        if regs is None:
+            return False
 
-            self.data.pressure = self._calc_pressure(adc_pres) / 100.0
-            self.data.humidity = self._calc_humidity(adc_hum) / 1000.0
+        self._set_field_data(regs)
+        return True
 
-            if self._variant == constants.VARIANT_HIGH:
-                self.data.gas_resistance = self._calc_gas_resistance_high(adc_gas_res_high, gas_range_h)
-            else:
-                self.data.gas_resistance = self._calc_gas_resistance_low(adc_gas_res_low, gas_range_l)
+    def collect_raw_data(self):
+        """Collect the field data registers of a triggered measurement, without compensation.
+
+        Returns FIELD_LENGTH bytes from FIELD0_ADDR, or None when no new data is available.
+
+        """
+        for attempt in range(10):
+            regs = self._get_regs(constants.FIELD0_ADDR, constants.FIELD_LENGTH)
+            if regs[0] & constants.NEW_DATA_MSK:
+                return regs
+            time.sleep(constants.POLL_PERIOD_MS / 1000.0)
 
-            return True
+        return None
+
+    async def collect_sensor_data_async(self):
+        """Collect the result of a triggered measurement, polling with asyncio.sleep.
+
+        Stores data in .data and returns True upon success.
+
+        """
+        for attempt in range(10):
+            if self._read_field_data():
+                return True
+            await asyncio.sleep(constants.POLL_PERIOD_MS / 1000.0)
 
         return False
 
+    def _read_field_data(self):
+        """Read field data into .data if a new measurement is available.
+
+        Status and field data are read in one burst, the status is regs[0].
+        Returns False when the measurement is not finished yet.
+
+        """
+        regs = self._get_regs(constants.FIELD0_ADDR, constants.FIELD_LENGTH)
+
+        if (regs[0] & constants.NEW_DATA_MSK) == 0:
+            return False
+
+        self._set_field_data(regs)
+        return True
+
+    def _set_field_data(self, regs):
+        """Compensate field data registers read at FIELD0_ADDR into .data."""
+        self.data.status = regs[0] & constants.NEW_DATA_MSK
+        # Contains the nb_profile used to obtain the current measurement
+        self.data.gas_index = regs[0] & constants.GAS_INDEX_MSK
+        self.data.meas_index = regs[1]
+
+        adc_pres = (regs[2] << 12) | (regs[3] << 4) | (regs[4] >> 4)
+        adc_temp = (regs[5] << 12) | (regs[6] << 4) | (regs[7] >> 4)
+        adc_hum = (regs[8] << 8) | regs[9]
+        adc_gas_res_low = (regs[13] << 2) | (regs[14] >> 6)
+        adc_gas_res_high = (regs[15] << 2) | (regs[16] >> 6)
+        gas_range_l = regs[14] & constants.GAS_RANGE_MSK
+        gas_range_h = regs[16] & constants.GAS_RANGE_MSK
+
+        if self._variant == constants.VARIANT_HIGH:
+            self.data.status |= regs[16] & constants.GASM_VALID_MSK
+            self.data.status |= regs[16] & constants.HEAT_STAB_MSK
+        else:
+            self.data.status |= regs[14] & constants.GASM_VALID_MSK
+            self.data.status |= regs[14] & constants.HEAT_STAB_MSK
+
+        self.data.heat_stable = (self.data.status & constants.HEAT_STAB_MSK) > 0
+
+        temperature = self._calc_temperature(adc_temp)
+        self.data.temperature = temperature / 100.0
+        self.ambient_temperature = temperature  # Saved for heater calc
+
+        self.data.pressure = self._calc_pressure(adc_pres) / 100.0
+        self.data.humidity = self._calc_humidity(adc_hum) / 1000.0
+
+        if self._variant == constants.VARIANT_HIGH:
+            self.data.gas_resistance = self._calc_gas_resistance_high(adc_gas_res_high, gas_range_h)
+        else:
+            self.data.gas_resistance = self._calc_gas_resistance_low(adc_gas_res_low, gas_range_l)
+
     def _set_bits(self, register, mask, position, value):
         """Mask out and set one or more bits in a register."""
-        temp = self._get_regs(register, 1)
+        temp = self._get_shadow_reg(register)
         temp &= ~mask
         temp |= value << position
         self._set_regs(register, temp)
@@ -342,16 +615,46 @@ class BME680(BME680Data):
     def _set_regs(self, register, value):
         """Set one or more registers."""
         if isinstance(value, int):
-            self._i2c.write_byte_data(self.i2c_addr, register, value)
+            self._transport.write_byte(register, value)
+            self._set_shadow_reg(register, value)
         else:
-            self._i2c.write_i2c_block_data(self.i2c_addr, register, value)
+            self._transport.write_block(register, value)
+            self.invalidate_cache()
+
+    def _set_pairs(self, pair_list):
+        """Set several registers in one transaction of (register, value) pairs.
+
+        The BME680 does not increment the register address on write,
+        so each value is preceded by its register address.
+
+        """
+        data = []
+        for register, value in pair_list[1:]:
+            data += [register, value]
+        self._transport.write_block(pair_list[0][0], [pair_list[0][1]] + data)
+        for register, value in pair_list:
+            self._set_shadow_reg(register, value)
+
+    def _get_shadow_reg(self, register):
+        """Get a configuration register from the shadow copy, reading the device only on a miss."""
+        if register not in self._shadow_regs:
+            self._set_shadow_reg(register, self._get_regs(register, 1))
+        return self._shadow_regs[register]
+
+    def _set_shadow_reg(self, register, value):
+        """Keep the written value of a configuration register in the shadow copy."""
+        if constants.SHADOW_REG_FIRST <= register <= constants.SHADOW_REG_LAST:
+            if register == constants.CONF_T_P_MODE_ADDR:
+                # Forced mode is one-shot, the device is in sleep mode once it is finished
+                value &= ~constants.MODE_MSK
+            self._shadow_regs[register] = value
 
     def _get_regs(self, register, length):
         """Get one or more registers."""
         if length == 1:
-            return self._i2c.read_byte_data(self.i2c_addr, register)
+            return self._transport.read_byte(register)
         else:
-            return self._i2c.read_i2c_block_data(self.i2c_addr, register, length)
+            return self._transport.read_block(register, length)
 
     def _calc_temperature(self, temperature_adc):
         """Convert the raw temperature to degrees C using calibration_data."""
@@ -22,8 +22,9 @@ class CCS811:
     3. Accuracy N/A. The value does not math with other sensors. See
        https://www.jaredwolff.com/finding-the-best-tvoc-sensor-ccs811-vs-bme680-vs-sgp30/
     """
-    def __init__(self, bus_n=0, addr=0x5a):
-        self._i2cdevice = I2CDevice(bus_n, addr)
+    # i2cdevice can be any pyi2c.I2CDevice compatible object, such as a simulated device
+    def __init__(self, bus_n=0, addr=0x5a, i2cdevice=None):
+        self._i2cdevice = i2cdevice if i2cdevice is not None else I2CDevice(bus_n, addr)
         # commands
         self._APP_START_ADDR = 0xf4 # from boot to application mode
         self._MEAS_MODE_ADDR = 0x01
@@ -93,16 +94,26 @@ class CCS811:
             is_ok = True
         return is_ok
 
-    def getECO2ETVOC(self):
+    # Read raw bytes of the result data: eCO2, TVOC, status, error id and raw data.
+    # Return None when the read failed
+    def readRaw(self):
         # Select result register address
         # and read 8 bytes data rapidly
         read_data = self._i2cdevice.writeread(self._RESULT_ADDR, 8)
 
+        # Check i2c status code is success
+        if self._i2cdevice.status_code.value != 0:
+            return None
+        return read_data
+
+    def getECO2ETVOC(self):
+        read_data = self.readRaw()
+
         # Prepare varibles
         eCO2 = TVOC = -1
 
-        # Check i2c status code is success
-        if self._i2cdevice.status_code.value == 0:
+        # Check read is success
+        if read_data is not None:
 
             # Treat status
             status = read_data[4]
@@ -61,6 +61,11 @@ MEM_PAGE_ADDR = 0xf3
 CONF_T_P_MODE_ADDR = 0x74
 CONF_ODR_FILT_ADDR = 0x75
 
+# Configuration registers kept in the shadow cache of the driver,
+# from the heater settings to the sensor configuration
+SHADOW_REG_FIRST = RES_HEAT0_ADDR
+SHADOW_REG_LAST = CONF_ODR_FILT_ADDR
+
 # Coefficient's address
 COEFF_ADDR1 = 0x89
 COEFF_ADDR2 = 0xe1
@@ -93,6 +98,9 @@ OS_4X = 3
 OS_8X = 4
 OS_16X = 5
 
+# Measurement cycles of each oversampling setting, OS_NONE to OS_16X
+OS_TO_MEAS_CYCLES = [0, 1, 2, 4, 8, 16]
+
 # IIR filter settings
 FILTER_SIZE_0 = 0
 FILTER_SIZE_1 = 1
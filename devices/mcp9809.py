@@ -16,8 +16,9 @@ class MCP9808:
         +-0.5 (maximum) from -20 C to +100 C
         +- 1 C (maximum) from -40 C to +125 C
     """
-    def __init__(self, bus_n=0, addr=0x18):
-        self._i2cdevice         = I2CDevice(bus_n, addr)
+    # i2cdevice can be any pyi2c.I2CDevice compatible object, such as a simulated device
+    def __init__(self, bus_n=0, addr=0x18, i2cdevice=None):
+        self._i2cdevice         = i2cdevice if i2cdevice is not None else I2CDevice(bus_n, addr)
         self._CONFIG_ADDR       = 0x01
         self._ENABLE_EVENT_LIST = [0x00, 0x08] # Enable event output
         self._T_A_POINTER_ADDR  = 0x05
@@ -46,6 +47,16 @@ class MCP9808:
     #        is_ok = True
     #    return is_ok
 
+    # Read raw bytes of the ambient temperature register.
+    # Return None when the read failed
+    def readRaw(self):
+        read_data = self._i2cdevice.writeread(self._T_A_POINTER_ADDR, 2)
+
+        # Check i2c status code is success
+        if self._i2cdevice.status_code.value != 0:
+            return None
+        return read_data
+
     def getTemperature(self):
         # Write trigger measurement
         #self._i2cdevice.write(self._TRIG_MEAS_LIST)
@@ -54,13 +65,13 @@ class MCP9808:
         #time.sleep(.1) # .1 s
 
         # Read 2 bytes of data
-        read_data = self._i2cdevice.writeread(self._T_A_POINTER_ADDR, 2)
+        read_data = self.readRaw()
 
         # Init variables
         temperature = -1
 
-        # Check i2c status code is success
-        if self._i2cdevice.status_code.value == 0:
+        # Check read is success
+        if read_data is not None:
 
             # Fill data
             temperature = ((read_data[0] & 0x0f) * 2**4) + (read_data[1] * 2**-4)
@@ -0,0 +1,577 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# devices/simbus.py
+"""
+Simulated I2C bus, to run drivers without hardware.
+Each chip emulates its own register map or command set:
+- AHT10/AHT21: trigger command, status byte with busy and calibration bits, CRC
+- MCP9808: 16 bit registers selected by pointer, ambient temperature at 0x05
+- BME680: calibration and field data registers, forced mode conversion time
+- CCS811: application mode, measurement mode and result data block at 0x02
+Transactions can have latency, and can fail by fault injection.
+"""
+
+import enum, errno, logging, random, threading, time
+from types import SimpleNamespace
+
+from . import constants
+from .bme680_example import BME680
+
+# Read flag of smbus2.i2c_msg, as I2C_M_RD of linux/i2c.h
+I2C_M_RD = 0x0001
+
+
+# =================================================
+class StatusCode(enum.Enum):
+    """
+    Same as pyi2c.StatusCode
+    """
+    success = 0
+    ready   = 1
+    fail    = 9
+
+
+# =================================================
+class SimBus:
+    """
+    A simulated /dev/i2c-N.
+    One transaction at a time, as a real bus.
+    Each transaction takes latency_second, plus 9 clocks per byte at clock_hz when clock_hz is set.
+    Each transaction fails with fault_rate probability, or by failNext().
+    """
+    def __init__(self, bus_n, clock_hz=None, latency_second=0.0, fault_rate=0.0):
+        self.bus_n = bus_n
+        self.clock_hz = clock_hz
+        self.latency_second = latency_second
+        self.fault_rate = fault_rate
+        self._chip_dict = {}
+        self._lock = threading.Lock()
+        self._fail_cnt = 0
+        self.resetCounters()
+
+    def resetCounters(self):
+        self.transaction_cnt = 0
+        self.byte_cnt = 0
+        self.error_cnt = 0
+        self.busy_second = 0.0
+
+    def addChip(self, addr, chip):
+        self._chip_dict[addr] = chip
+
+    def getChip(self, addr):
+        return self._chip_dict.get(addr)
+
+    # The next n transactions fail
+    def failNext(self, n=1):
+        self._fail_cnt += n
+
+    # One transaction of messages, as i2c_rdwr.
+    # msg_list is a list of ('w', data) or ('r', byte_size).
+    # Return the list of read data, one per read message
+    def transfer(self, addr, msg_list):
+        with self._lock:
+            byte_size = sum(1 + (len(msg) if kind == 'w' else msg) for kind, msg in msg_list)
+            transfer_second = self.latency_second
+            if self.clock_hz:
+                transfer_second += byte_size * 9 / self.clock_hz
+            if transfer_second > 0:
+                time.sleep(transfer_second)
+
+            self.transaction_cnt += 1
+            self.byte_cnt += byte_size
+            self.busy_second += transfer_second
+
+            chip = self._chip_dict.get(addr)
+            if chip is None:
+                self.error_cnt += 1
+                raise OSError(errno.EREMOTEIO, f'No device at 0x{addr:02x} on simulated bus {self.bus_n}')
+            if self._fail_cnt > 0 or (self.fault_rate and random.random() < self.fault_rate):
+                self._fail_cnt = max(self._fail_cnt - 1, 0)
+                self.error_cnt += 1
+                raise OSError(errno.EIO, f'Injected fault at 0x{addr:02x} on simulated bus {self.bus_n}')
+
+            read_list = []
+            for kind, msg in msg_list:
+                if kind == 'w':
+                    chip.write(list(msg))
+                else:
+                    read_list.append(chip.read(msg))
+            return read_list
+
+
+# =================================================
+class SimI2CDevice:
+    """
+    pyi2c.I2CDevice compatible device on a SimBus.
+    Errors are logged and set status_code, as pyi2c does.
+    """
+    def __init__(self, bus, addr):
+        self._bus = bus
+        self._addr = addr
+        self._status_code = StatusCode.ready
+
+    @property
+    def status_code(self):
+        return self._status_code
+
+    def _transfer(self, msg_list, byte_size=0):
+        try:
+            read_list = self._bus.transfer(self._addr, msg_list)
+            self._status_code = StatusCode.success
+        except OSError as e:
+            self._status_code = StatusCode.fail
+            logging.error('Cannot transfer on simulated bus: %d, addr: %s. %s'
+                    % (self._bus.bus_n, hex(self._addr), e) )
+            read_list = [[0] * byte_size] if byte_size else []
+        if not read_list:
+            return None
+        read_data = read_list[0]
+        return read_data[0] if len(read_data) == 1 else read_data
+
+    def write(self, data):
+        if not type(data) == list:
+            data = [ data ]
+        self._transfer([('w', data)])
+
+    def read(self, byte_size=1):
+        return self._transfer([('r', byte_size)], byte_size)
+
+    def writeread(self, data, byte_size=1):
+        if not type(data) == list:
+            data = [ data ]
+        return self._transfer([('w', data), ('r', byte_size)], byte_size)
+
+
+# =================================================
+class SimSMBus:
+    """
+    smbus.SMBus compatible bus on a SimBus. Errors raise OSError, as smbus does.
+    i2c_rdwr of smbus2.SMBus is one transaction, as on hardware.
+    """
+    def __init__(self, bus):
+        self._bus = bus
+
+    def read_byte_data(self, addr, register):
+        return self._bus.transfer(addr, [('w', [register]), ('r', 1)])[0][0]
+
+    def read_i2c_block_data(self, addr, register, length):
+        return self._bus.transfer(addr, [('w', [register]), ('r', length)])[0]
+
+    def write_byte_data(self, addr, register, value):
+        self._bus.transfer(addr, [('w', [register, value])])
+
+    def write_i2c_block_data(self, addr, register, data):
+        self._bus.transfer(addr, [('w', [register] + list(data))])
+
+    # Combined transaction of smbus2.i2c_msg messages, read messages are filled in place
+    def i2c_rdwr(self, *i2c_msgs):
+        msg_list = [('r', msg.len) if msg.flags & I2C_M_RD else ('w', list(msg)) for msg in i2c_msgs]
+        read_data_list = self._bus.transfer(i2c_msgs[0].addr, msg_list)
+        for msg in i2c_msgs:
+            if msg.flags & I2C_M_RD:
+                for i, value in enumerate(read_data_list.pop(0)):
+                    msg.buf[i] = bytes([value])
+
+
+# =================================================
+class SimChip:
+    """
+    Base class of simulated chips.
+    write() receives the bytes of a write message, read() returns bytes of a read message.
+    environment is a dict shared by all chips of a SimBackend.
+    """
+    def __init__(self, environment):
+        self.environment = environment
+
+    def write(self, data):
+        pass
+
+    def read(self, byte_size):
+        return [0] * byte_size
+
+
+def _crc8(data):
+    # CRC-8, polynomial 0x31, initial value 0xFF, as AHT10/AHT21
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x31) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+class AHTChip(SimChip):
+    """
+    AHT10/AHT21. Trigger measurement [0xAC, 0x33, 0x00], busy for 80 ms,
+    then read status, 20 bit humidity, 20 bit temperature and CRC.
+    """
+    MEAS_SECOND = .08
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self._status = 0x18 # Calibrated
+        self._meas_end = 0.0
+        self._data = [0] * 5
+        self._is_status_only = False
+
+    def write(self, data):
+        self._is_status_only = False
+        if data[0] == 0xAC:
+            humidity_raw = min(max(int(self.environment['humidity'] / 100 * 2**20), 0), 2**20 - 1)
+            temperature_raw = min(max(int((self.environment['temperature'] + 50) / 200 * 2**20), 0), 2**20 - 1)
+            self._data = [
+                    humidity_raw >> 12,
+                    (humidity_raw >> 4) & 0xff,
+                    ((humidity_raw & 0x0f) << 4) | (temperature_raw >> 16),
+                    (temperature_raw >> 8) & 0xff,
+                    temperature_raw & 0xff,
+                    ]
+            self._meas_end = time.monotonic() + self.MEAS_SECOND
+        elif data[0] == 0x71:
+            self._is_status_only = True
+        elif data[0] in (0xBA, 0xE1, 0x1B, 0x1C, 0x1E):
+            self._status = 0x18
+
+    def read(self, byte_size):
+        status = self._status
+        if time.monotonic() < self._meas_end:
+            status |= 0x80 # Busy
+        if self._is_status_only:
+            return [status] * byte_size
+        read_data = [status] + self._data
+        read_data.append(_crc8(read_data))
+        return (read_data + [0] * byte_size)[:byte_size]
+
+
+class MCP9808Chip(SimChip):
+    """
+    MCP9808. 16 bit registers selected by the first written byte (pointer).
+    Ambient temperature at 0x05 in 1/16 C, with sign at bit 12.
+    """
+    def __init__(self, environment):
+        super().__init__(environment)
+        self._pointer = 0
+        self._reg_dict = {0x01: 0x0000, 0x06: 0x0054, 0x07: 0x0400, 0x08: 0x03}
+
+    def write(self, data):
+        self._pointer = data[0] & 0x0f
+        if len(data) >= 3:
+            self._reg_dict[self._pointer] = (data[1] << 8) | data[2]
+
+    def read(self, byte_size):
+        if self._pointer == 0x05:
+            value = int(round(self.environment['temperature'] * 16)) & 0x1fff
+        else:
+            value = self._reg_dict.get(self._pointer, 0)
+        read_data = [value >> 8, value & 0xff] if self._pointer != 0x08 else [value & 0xff]
+        return (read_data + [0] * byte_size)[:byte_size]
+
+
+class CCS811Chip(SimChip):
+    """
+    CCS811. Boot mode until APP_START (0xF4), then a new result every second
+    while measurement mode is set. Result data block at 0x02:
+    eCO2, eTVOC, STATUS, ERROR_ID, RAW_DATA
+    """
+    SAMPLE_SECOND = 1.0
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self._pointer = 0
+        self._is_app_mode = False
+        self._meas_mode = 0
+        self._last_result_read = 0.0
+
+    def write(self, data):
+        self._pointer = data[0]
+        if data[0] == 0xF4:
+            self._is_app_mode = True
+        elif data[0] == 0x01 and len(data) >= 2:
+            self._meas_mode = data[1]
+        elif data[0] == 0xFF and data[1:] == [0x11, 0xE5, 0x72, 0x8A]:
+            self._is_app_mode = False
+            self._meas_mode = 0
+
+    def _getStatus(self):
+        status = 0x10 # APP_VALID
+        if self._is_app_mode:
+            status |= 0x80 # FW_MODE
+            if (self._meas_mode & 0x70
+                    and time.monotonic() - self._last_result_read >= self.SAMPLE_SECOND):
+                status |= 0x08 # DATA_READY
+        return status
+
+    def read(self, byte_size):
+        if self._pointer == 0x00:
+            read_data = [self._getStatus()]
+        elif self._pointer == 0x02:
+            status = self._getStatus()
+            eCO2 = int(self.environment['eCO2'])
+            eTVOC = int(self.environment['eTVOC'])
+            read_data = [eCO2 >> 8, eCO2 & 0xff, eTVOC >> 8, eTVOC & 0xff, status, 0, 0x10, 0x00]
+            if status & 0x08:
+                self._last_result_read = time.monotonic()
+        elif self._pointer == 0x20:
+            read_data = [0x81] # HW_ID
+        else:
+            read_data = []
+        return (read_data + [0] * byte_size)[:byte_size]
+
+
+class BME680Chip(SimChip):
+    """
+    BME680 (low variant) register map.
+    A write message is a register address and data, followed by (address, data) pairs,
+    as the BME680 does not increment the address on write. Read increments the address.
+    Writing forced mode to 0x74 starts a conversion, which takes the TPH conversion time
+    plus the heater duration. Then field data are filled and the mode returns to sleep.
+    """
+    # Calibration of a real sensor
+    CALIBRATION = SimpleNamespace(
+            par_t1=26041, par_t2=26183, par_t3=3,
+            par_p1=36005, par_p2=-10247, par_p3=88, par_p4=6853, par_p5=-80,
+            par_p6=30, par_p7=42, par_p8=-1563, par_p9=-3090, par_p10=30,
+            par_h1=781, par_h2=1011, par_h3=0, par_h4=45, par_h5=20, par_h6=120, par_h7=-100,
+            par_gh1=-30, par_gh2=-5969, par_gh3=18,
+            res_heat_range=1, res_heat_val=47, range_sw_err=0,
+            )
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self._regs = [0] * 256
+        self._pointer = 0
+        self._meas_end = None
+        self._meas_index = 0
+        self._adc_cache = None
+
+        # Non-volatile registers
+        self._regs[constants.CHIP_ID_ADDR] = constants.CHIP_ID
+        self._regs[constants.CHIP_VARIANT_ADDR] = constants.VARIANT_LOW
+        self._writeCalibration()
+
+        # The driver's own compensation, to find ADC values of the environment
+        calibration_data = constants.CalibrationData()
+        calibration_data.set_from_array(self._getCalibrationArray())
+        calibration_data.set_other(
+                self._regs[constants.ADDR_RES_HEAT_RANGE_ADDR],
+                constants.twos_comp(self._regs[constants.ADDR_RES_HEAT_VAL_ADDR], bits=8),
+                constants.twos_comp(self._regs[constants.ADDR_RANGE_SW_ERR_ADDR], bits=8),
+                )
+        self._compensation = SimpleNamespace(
+                calibration_data=calibration_data, offset_temp_in_t_fine=0,
+                _variant=constants.VARIANT_LOW,
+                )
+
+    def _writeCalibration(self):
+        cal = self.CALIBRATION
+        array = [0] * (constants.COEFF_ADDR1_LEN + constants.COEFF_ADDR2_LEN)
+
+        def setWord(msb_index, lsb_index, value):
+            value &= 0xffff
+            array[msb_index] = value >> 8
+            array[lsb_index] = value & 0xff
+
+        setWord(constants.T1_MSB_REG, constants.T1_LSB_REG, cal.par_t1)
+        setWord(constants.T2_MSB_REG, constants.T2_LSB_REG, cal.par_t2)
+        array[constants.T3_REG] = cal.par_t3 & 0xff
+        setWord(constants.P1_MSB_REG, constants.P1_LSB_REG, cal.par_p1)
+        setWord(constants.P2_MSB_REG, constants.P2_LSB_REG, cal.par_p2)
+        array[constants.P3_REG] = cal.par_p3 & 0xff
+        setWord(constants.P4_MSB_REG, constants.P4_LSB_REG, cal.par_p4)
+        setWord(constants.P5_MSB_REG, constants.P5_LSB_REG, cal.par_p5)
+        array[constants.P6_REG] = cal.par_p6 & 0xff
+        array[constants.P7_REG] = cal.par_p7 & 0xff
+        setWord(constants.P8_MSB_REG, constants.P8_LSB_REG, cal.par_p8)
+        setWord(constants.P9_MSB_REG, constants.P9_LSB_REG, cal.par_p9)
+        array[constants.P10_REG] = cal.par_p10 & 0xff
+        array[constants.H1_MSB_REG] = cal.par_h1 >> 4
+        array[constants.H2_MSB_REG] = cal.par_h2 >> 4
+        array[constants.H1_LSB_REG] = ((cal.par_h2 & 0x0f) << 4) | (cal.par_h1 & 0x0f)
+        array[constants.H3_REG] = cal.par_h3 & 0xff
+        array[constants.H4_REG] = cal.par_h4 & 0xff
+        array[constants.H5_REG] = cal.par_h5 & 0xff
+        array[constants.H6_REG] = cal.par_h6 & 0xff
+        array[constants.H7_REG] = cal.par_h7 & 0xff
+        array[constants.GH1_REG] = cal.par_gh1 & 0xff
+        setWord(constants.GH2_MSB_REG, constants.GH2_LSB_REG, cal.par_gh2)
+        array[constants.GH3_REG] = cal.par_gh3 & 0xff
+
+        self._regs[constants.COEFF_ADDR1:constants.COEFF_ADDR1 + constants.COEFF_ADDR1_LEN] = \
+                array[:constants.COEFF_ADDR1_LEN]
+        self._regs[constants.COEFF_ADDR2:constants.COEFF_ADDR2 + constants.COEFF_ADDR2_LEN] = \
+                array[constants.COEFF_ADDR1_LEN:]
+        self._regs[constants.ADDR_RES_HEAT_RANGE_ADDR] = cal.res_heat_range << 4
+        self._regs[constants.ADDR_RES_HEAT_VAL_ADDR] = cal.res_heat_val & 0xff
+        self._regs[constants.ADDR_RANGE_SW_ERR_ADDR] = (cal.range_sw_err << 4) & 0xff
+
+    def _getCalibrationArray(self):
+        return (self._regs[constants.COEFF_ADDR1:constants.COEFF_ADDR1 + constants.COEFF_ADDR1_LEN]
+                + self._regs[constants.COEFF_ADDR2:constants.COEFF_ADDR2 + constants.COEFF_ADDR2_LEN])
+
+    def _reset(self):
+        for addr in range(constants.FIELD0_ADDR, constants.FIELD0_ADDR + constants.FIELD_LENGTH):
+            self._regs[addr] = 0
+        for addr in range(constants.RES_HEAT0_ADDR, constants.CONF_ODR_FILT_ADDR + 1):
+            self._regs[addr] = 0
+        self._meas_end = None
+
+    # Conversion time in second of the current settings
+    def getMeasurementSecond(self):
+        os_to_cycles = [0, 1, 2, 4, 8, 16]
+        ctrl_meas = self._regs[constants.CONF_T_P_MODE_ADDR]
+        os_t = (ctrl_meas & constants.OST_MSK) >> constants.OST_POS
+        os_p = (ctrl_meas & constants.OSP_MSK) >> constants.OSP_POS
+        os_h = self._regs[constants.CONF_OS_H_ADDR] & constants.OSH_MSK
+        cycles = os_to_cycles[min(os_t, 5)] + os_to_cycles[min(os_p, 5)] + os_to_cycles[min(os_h, 5)]
+        meas_us = cycles * 1963 + 477 * 4 + 477 * 5 + 500
+
+        ctrl_gas_1 = self._regs[constants.CONF_ODR_RUN_GAS_NBC_ADDR]
+        heat_ms = 0
+        if ctrl_gas_1 & constants.RUN_GAS_MSK:
+            gas_wait = self._regs[constants.GAS_WAIT0_ADDR + (ctrl_gas_1 & constants.NBCONV_MSK)]
+            heat_ms = (gas_wait & 0x3f) * 4**(gas_wait >> 6)
+        return meas_us / 10**6 + heat_ms / 1000
+
+    def _update(self):
+        if self._meas_end is None or time.monotonic() < self._meas_end:
+            return
+        self._meas_end = None
+        self._meas_index = (self._meas_index + 1) & 0xff
+        adc_temp, adc_pres, adc_hum, adc_gas, gas_range = self._getADC()
+
+        field = [0] * constants.FIELD_LENGTH
+        ctrl_gas_1 = self._regs[constants.CONF_ODR_RUN_GAS_NBC_ADDR]
+        field[0] = constants.NEW_DATA_MSK | (ctrl_gas_1 & constants.GAS_INDEX_MSK)
+        field[1] = self._meas_index
+        field[2:5] = [adc_pres >> 12, (adc_pres >> 4) & 0xff, (adc_pres & 0x0f) << 4]
+        field[5:8] = [adc_temp >> 12, (adc_temp >> 4) & 0xff, (adc_temp & 0x0f) << 4]
+        field[8:10] = [adc_hum >> 8, adc_hum & 0xff]
+        field[13] = adc_gas >> 2
+        field[14] = ((adc_gas & 0x03) << 6) | gas_range
+        if ctrl_gas_1 & constants.RUN_GAS_MSK:
+            field[14] |= constants.GASM_VALID_MSK | constants.HEAT_STAB_MSK
+        self._regs[constants.FIELD0_ADDR:constants.FIELD0_ADDR + constants.FIELD_LENGTH] = field
+
+        # Back to sleep mode
+        self._regs[constants.CONF_T_P_MODE_ADDR] &= ~constants.MODE_MSK & 0xff
+
+    # Find ADC values of the environment, with the driver's compensation
+    def _getADC(self):
+        key = (self.environment['temperature'], self.environment['pressure'],
+                self.environment['humidity'], self.environment['gas_resistance'])
+        if self._adc_cache is not None and self._adc_cache[0] == key:
+            return self._adc_cache[1]
+        comp = self._compensation
+
+        def search(func, target, lo, hi, is_increasing=True):
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if (func(mid) < target) == is_increasing:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        temperature, pressure, humidity, gas_resistance = key
+        adc_temp = search(lambda adc: BME680._calc_temperature(comp, adc) / 100.0, temperature, 0, 2**20 - 1)
+        BME680._calc_temperature(comp, adc_temp) # Set t_fine
+        adc_pres = search(lambda adc: BME680._calc_pressure(comp, adc) / 100.0, pressure, 0, 2**20 - 1, False)
+        adc_hum = search(lambda adc: BME680._calc_humidity(comp, adc) / 1000.0, humidity, 0, 2**16 - 1)
+
+        # Gas resistance decreases with ADC, in each of 16 ranges
+        best = None
+        for gas_range in range(16):
+            adc_gas = search(lambda adc: BME680._calc_gas_resistance_low(comp, adc, gas_range),
+                    gas_resistance, 1, 2**10 - 1, False)
+            error = abs(BME680._calc_gas_resistance_low(comp, adc_gas, gas_range) - gas_resistance)
+            if best is None or error < best[0]:
+                best = (error, adc_gas, gas_range)
+
+        adc = (adc_temp, adc_pres, adc_hum, best[1], best[2])
+        self._adc_cache = (key, adc)
+        return adc
+
+    def write(self, data):
+        self._update()
+        self._pointer = data[0]
+        pair_list = [(data[0], data[1])] if len(data) >= 2 else []
+        pair_list += [(data[i], data[i+1]) for i in range(2, len(data) - 1, 2)]
+        for register, value in pair_list:
+            if register == constants.SOFT_RESET_ADDR:
+                if value == constants.SOFT_RESET_CMD:
+                    self._reset()
+                continue
+            self._regs[register] = value & 0xff
+            if (register == constants.CONF_T_P_MODE_ADDR
+                    and value & constants.MODE_MSK == constants.FORCED_MODE):
+                self._regs[constants.FIELD0_ADDR] &= ~constants.NEW_DATA_MSK & 0xff
+                self._regs[constants.FIELD0_ADDR] |= 0x20 # Measuring
+                self._meas_end = time.monotonic() + self.getMeasurementSecond()
+
+    def read(self, byte_size):
+        self._update()
+        read_data = []
+        for i in range(byte_size):
+            read_data.append(self._regs[(self._pointer + i) & 0xff])
+        self._pointer = (self._pointer + byte_size) & 0xff
+        return read_data
+
+
+# =================================================
+class SimBackend:
+    """
+    Simulated buses of all config.json devices, with a shared environment.
+    Provides getI2CDevice and getSMBus as helpers.sensors.HardwareBackend does.
+    """
+    CHIP_CLASS_DICT = {
+            'AHT10': (AHTChip, 0x38),
+            'AHT21': (AHTChip, 0x38),
+            'MCP9808': (MCP9808Chip, 0x18),
+            'CCS811': (CCS811Chip, 0x5a),
+            'BME680': (BME680Chip, 0x77),
+            }
+
+    def __init__(self, clock_hz=None, latency_second=0.0, fault_rate=0.0):
+        self._clock_hz = clock_hz
+        self._latency_second = latency_second
+        self._fault_rate = fault_rate
+        self._bus_dict = {}
+        self.environment = {
+                'temperature': 25.0, 'humidity': 50.0, 'pressure': 1013.25,
+                'gas_resistance': 50000.0, 'eCO2': 400, 'eTVOC': 10,
+                }
+
+    @classmethod
+    def fromConfig(cls, config, **kwargs):
+        backend = cls(**kwargs)
+        for config_device in config['devices']:
+            backend.addDevice(config_device)
+        return backend
+
+    def getBus(self, bus_n):
+        bus = self._bus_dict.get(bus_n)
+        if bus is None:
+            bus = SimBus(bus_n, self._clock_hz, self._latency_second, self._fault_rate)
+            self._bus_dict[bus_n] = bus
+        return bus
+
+    @property
+    def bus_list(self):
+        return list(self._bus_dict.values())
+
+    # Add the chip of a config.json device. Devices without emulation are ignored
+    def addDevice(self, config_device):
+        chip_class, addr = self.CHIP_CLASS_DICT.get(config_device['name'], (None, None))
+        if chip_class is None:
+            return None
+        if 'address' in config_device:
+            addr = int(config_device['address'], 16)
+        chip = chip_class(self.environment)
+        self.getBus(config_device['bus']).addChip(addr, chip)
+        return chip
+
+    def getI2CDevice(self, bus_n, addr):
+        return SimI2CDevice(self.getBus(bus_n), addr)
+
+    def getSMBus(self, bus_n):
+        return SimSMBus(self.getBus(bus_n))
@@ -0,0 +1,238 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# devices/tracing.py
+"""
+Trace I2C transactions of each device:
+count, bytes, errors and latency histogram per device and operation.
+Optionally every transaction is dumped to a trace file, one JSON per line.
+The file is flushed every FLUSH_SECOND or FLUSH_LINE_COUNT lines, and rotated over max_bytes
+as trace_filename.1, .2, ..., so that it can stay on.
+"""
+
+import bisect, json, os, threading, time
+
+FLUSH_SECOND = 1.0
+FLUSH_LINE_COUNT = 1000
+MAX_BYTES = 100 * 2**20
+BACKUP_COUNT = 3
+
+
+class TraceRecorder:
+    """
+    Collect transactions from TracedI2CDevice and TracedSMBus.
+    Latency histogram buckets are upper bounds in micro second.
+    """
+    BUCKET_US_LIST = [50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000]
+
+    def __init__(self, trace_filename=None, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self._lock = threading.Lock()
+        self._stats_dict = {}
+        self._trace_filename = trace_filename
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._trace_file = open(trace_filename, 'a') if trace_filename else None
+        self._line_cnt = 0
+        self._flush_due = time.monotonic() + FLUSH_SECOND
+
+    def record(self, device, operation, byte_size, latency_ns, is_error):
+        latency_us = latency_ns / 1000
+        bucket_index = bisect.bisect_left(self.BUCKET_US_LIST, latency_us)
+        with self._lock:
+            stats = self._stats_dict.get((device, operation))
+            if stats is None:
+                stats = [0, 0, 0, 0.0, [0] * (len(self.BUCKET_US_LIST) + 1)]
+                self._stats_dict[(device, operation)] = stats
+            stats[0] += 1
+            stats[1] += byte_size
+            stats[2] += is_error
+            stats[3] += latency_us
+            stats[4][bucket_index] += 1
+            if self._trace_file is not None:
+                self._trace_file.write(json.dumps({
+                    'time': time.time_ns(), 'device': device, 'operation': operation,
+                    'bytes': byte_size, 'latency_us': latency_us, 'error': bool(is_error),
+                    }) + '\n')
+                self._line_cnt += 1
+                if self._line_cnt >= FLUSH_LINE_COUNT or time.monotonic() >= self._flush_due:
+                    self._flushTraceFile()
+
+    # {device: {operation: {'count', 'bytes', 'errors', 'mean_us', 'histogram'}}}
+    # histogram is {'<=50us': count, ..., '>100000us': count}
+    def getHistograms(self):
+        label_list = [f'<={us}us' for us in self.BUCKET_US_LIST] + [f'>{self.BUCKET_US_LIST[-1]}us']
+        histogram_dict = {}
+        with self._lock:
+            for (device, operation), stats in self._stats_dict.items():
+                count, byte_size, error_cnt, total_us, bucket_list = stats
+                histogram_dict.setdefault(device, {})[operation] = {
+                        'count': count,
+                        'bytes': byte_size,
+                        'errors': error_cnt,
+                        'mean_us': total_us / count if count else 0.0,
+                        'histogram': dict(zip(label_list, bucket_list)),
+                        }
+        return histogram_dict
+
+    def reset(self):
+        with self._lock:
+            self._stats_dict = {}
+
+    def flush(self):
+        if self._trace_file is not None:
+            with self._lock:
+                self._flushTraceFile()
+
+    # Called with the lock held
+    def _flushTraceFile(self):
+        self._trace_file.flush()
+        self._line_cnt = 0
+        self._flush_due = time.monotonic() + FLUSH_SECOND
+        if self._max_bytes and self._trace_file.tell() >= self._max_bytes:
+            self._rotate()
+
+    # trace_filename to .1, .1 to .2 and so on, the oldest is removed
+    def _rotate(self):
+        self._trace_file.close()
+        for i in range(self._backup_count - 1, 0, -1):
+            if os.path.exists(f'{self._trace_filename}.{i}'):
+                os.replace(f'{self._trace_filename}.{i}', f'{self._trace_filename}.{i + 1}')
+        if self._backup_count > 0:
+            os.replace(self._trace_filename, f'{self._trace_filename}.1')
+        else:
+            os.remove(self._trace_filename)
+        self._trace_file = open(self._trace_filename, 'a')
+
+    def close(self):
+        if self._trace_file is not None:
+            with self._lock:
+                self._trace_file.close()
+                self._trace_file = None
+
+
+# =================================================
+class TracedI2CDevice:
+    """
+    Wrap pyi2c.I2CDevice compatible device.
+    A transaction is an error when status_code is not success.
+    """
+    def __init__(self, i2cdevice, recorder, device):
+        self._i2cdevice = i2cdevice
+        self._recorder = recorder
+        self._device = device
+
+    @property
+    def status_code(self):
+        return self._i2cdevice.status_code
+
+    def _record(self, operation, byte_size, start_ns):
+        latency_ns = time.perf_counter_ns() - start_ns
+        self._recorder.record(self._device, operation, byte_size, latency_ns,
+                self._i2cdevice.status_code.value != 0)
+
+    def write(self, data):
+        start_ns = time.perf_counter_ns()
+        self._i2cdevice.write(data)
+        self._record('write', len(data) if type(data) == list else 1, start_ns)
+
+    def read(self, byte_size=1):
+        start_ns = time.perf_counter_ns()
+        read_data = self._i2cdevice.read(byte_size)
+        self._record('read', byte_size, start_ns)
+        return read_data
+
+    def writeread(self, data, byte_size=1):
+        start_ns = time.perf_counter_ns()
+        read_data = self._i2cdevice.writeread(data, byte_size)
+        self._record('writeread', (len(data) if type(data) == list else 1) + byte_size, start_ns)
+        return read_data
+
+
+# =================================================
+class TracedSMBus:
+    """
+    Wrap smbus.SMBus compatible bus.
+    A transaction is an error when it raises an exception, which is re-raised.
+    device_dict gives device names by address, others are named as bus-address.
+    """
+    def __init__(self, smbus, recorder, bus_n, device_dict=None):
+        self._smbus = smbus
+        self._recorder = recorder
+        self._bus_n = bus_n
+        self._device_dict = device_dict if device_dict is not None else {}
+        # Drivers check i2c_rdwr with hasattr, so it is only there when smbus has it
+        if hasattr(smbus, 'i2c_rdwr'):
+            self.i2c_rdwr = self._i2cRdwr
+
+    def _getDevice(self, addr):
+        device = self._device_dict.get(addr)
+        if device is None:
+            device = f'{self._bus_n}-0x{addr:02x}'
+            self._device_dict[addr] = device
+        return device
+
+    def _call(self, operation, byte_size, addr, *args):
+        start_ns = time.perf_counter_ns()
+        is_error = True
+        try:
+            value = getattr(self._smbus, operation)(addr, *args)
+            is_error = False
+            return value
+        finally:
+            self._recorder.record(self._getDevice(addr), operation, byte_size,
+                    time.perf_counter_ns() - start_ns, is_error)
+
+    def read_byte_data(self, addr, register):
+        return self._call('read_byte_data', 2, addr, register)
+
+    def read_i2c_block_data(self, addr, register, length):
+        return self._call('read_i2c_block_data', 1 + length, addr, register, length)
+
+    def write_byte_data(self, addr, register, value):
+        return self._call('write_byte_data', 2, addr, register, value)
+
+    def write_i2c_block_data(self, addr, register, data):
+        return self._call('write_i2c_block_data', 1 + len(data), addr, register, data)
+
+    # Combined transaction of smbus2, messages are smbus2.i2c_msg
+    def _i2cRdwr(self, *i2c_msgs):
+        start_ns = time.perf_counter_ns()
+        is_error = True
+        try:
+            self._smbus.i2c_rdwr(*i2c_msgs)
+            is_error = False
+        finally:
+            self._recorder.record(self._getDevice(i2c_msgs[0].addr), 'i2c_rdwr',
+                    sum(msg.len for msg in i2c_msgs), time.perf_counter_ns() - start_ns, is_error)
+
+    # Other methods are not traced
+    def __getattr__(self, name):
+        return getattr(self._smbus, name)
+
+
+# =================================================
+class TracingBackend:
+    """
+    Wrap a backend, such as helpers.sensors.HardwareBackend or devices.simbus.SimBackend,
+    so that every device it opens is traced by recorder.
+    Devices are named by config.json name, or as bus-address.
+    """
+    def __init__(self, backend, recorder, config=None):
+        self._backend = backend
+        self.recorder = recorder
+        self._name_dict = {}
+        if config is not None:
+            for config_device in config['devices']:
+                if 'address' in config_device:
+                    self._name_dict[(config_device['bus'], int(config_device['address'], 16))] = \
+                            config_device['name']
+
+    def _getDevice(self, bus_n, addr):
+        return self._name_dict.get((bus_n, addr), f'{bus_n}-0x{addr:02x}')
+
+    def getI2CDevice(self, bus_n, addr):
+        return TracedI2CDevice(self._backend.getI2CDevice(bus_n, addr), self.recorder,
+                self._getDevice(bus_n, addr))
+
+    def getSMBus(self, bus_n):
+        device_dict = {addr: name for (bus, addr), name in self._name_dict.items() if bus == bus_n}
+        return TracedSMBus(self._backend.getSMBus(bus_n), self.recorder, bus_n, device_dict)
@@ -0,0 +1,82 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/capture.py
+"""
+Raw capture file of register bytes, decoded later by helpers.capturereader.
+
+File layout:
+- MAGIC, 8 bytes
+- header size, uint32 little endian
+- header, JSON of {'record_size', 'raw_size', 'devices': [{'id', 'name', ...capture info}]}
+- records of RECORD_SIZE bytes:
+    time in ns (int64), device id (uint16), raw size (uint8, 0 when the read failed),
+    reserved (uint8), raw bytes padded to RAW_SIZE
+"""
+
+import json, struct
+
+
+MAGIC = b'I2CRAW01'
+HEADER_SIZE_FORMAT = '<I'
+RECORD_FORMAT = '<qHBx20s'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+RAW_SIZE = 20
+
+
+# Read the header dict of a capture file, and the offset of the first record
+def readHeader(capture_file):
+    magic = capture_file.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError(f'Not a raw capture file: {capture_file.name}')
+    header_size, = struct.unpack(HEADER_SIZE_FORMAT, capture_file.read(struct.calcsize(HEADER_SIZE_FORMAT)))
+    header = json.loads(capture_file.read(header_size))
+    return header, len(MAGIC) + struct.calcsize(HEADER_SIZE_FORMAT) + header_size
+
+
+# =================================================
+class CaptureWriter:
+    """
+    Append raw results of collectCycle(is_raw=True) to a capture file.
+    Each record has the device id of its sensor, the index in sensor_list.
+    An existing file is appended to only when its header has the same devices,
+    since record device ids are indexes of the header's device list.
+    """
+    def __init__(self, filename, sensor_list):
+        self._id_dict = {}
+        device_list = []
+        for device_id, sensor in enumerate(sensor_list):
+            self._id_dict[id(sensor)] = device_id
+            device_list.append({'id': device_id, 'name': sensor.name, **sensor.getCaptureInfo()})
+        header = {'record_size': RECORD_SIZE, 'raw_size': RAW_SIZE, 'devices': device_list}
+        # Same as a header read back from a file
+        header = json.loads(json.dumps(header))
+
+        self._file = open(filename, 'ab')
+        if self._file.tell() == 0:
+            header_json = json.dumps(header).encode()
+            self._file.write(MAGIC + struct.pack(HEADER_SIZE_FORMAT, len(header_json)) + header_json)
+            self._file.flush()
+            self._record_offset = self._file.tell()
+        else:
+            with open(filename, 'rb') as capture_file:
+                old_header, self._record_offset = readHeader(capture_file)
+            if old_header != header:
+                self._file.close()
+                raise ValueError(f'{filename} was captured with other devices or calibrations')
+            # Drop a record cut by a crash, so that records stay aligned
+            record_cnt = (self._file.tell() - self._record_offset) // RECORD_SIZE
+            self._file.truncate(self._record_offset + record_cnt * RECORD_SIZE)
+            self._file.seek(0, 2)
+
+    # Append records of result list, in one write
+    def write(self, result_list):
+        record_list = []
+        for result in result_list:
+            raw = bytes(result['raw']) if result['raw'] is not None else b''
+            record_list.append(struct.pack(RECORD_FORMAT,
+                result['time'], self._id_dict[result['sensor_id']], len(raw), raw))
+        self._file.write(b''.join(record_list))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,156 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/capturereader.py
+"""
+Decode raw capture files of helpers.capture into physical values in bulk, with NumPy.
+Each decoder gives the same values as the driver, and -1 when the driver gives -1.
+
+Print a summary of each device
+    python3 -m helpers.capturereader capture/i2c.raw
+and write all values as CSV
+    python3 -m helpers.capturereader capture/i2c.raw --csv capture/i2c.csv
+"""
+
+import argparse, csv, struct
+from types import SimpleNamespace
+
+import numpy as np
+
+from devices import bme680_batch, constants
+from helpers.capture import RAW_SIZE, RECORD_FORMAT, RECORD_SIZE, readHeader
+
+
+RECORD_DTYPE = np.dtype([
+    ('time', '<i8'), ('device', '<u2'), ('size', 'u1'), ('reserved', 'u1'), ('raw', 'u1', (RAW_SIZE,)),
+    ])
+assert RECORD_DTYPE.itemsize == RECORD_SIZE == struct.calcsize(RECORD_FORMAT)
+
+
+# -------------------------
+# Decoders of each device name.
+# raw is an array of shape (N, RAW_SIZE), ok is False where the read failed.
+# Return dict of value arrays, -1 where the value is invalid
+
+# AHT10 and AHT21 drivers lower temperature by 1 C, as their own calibration
+def _decodeAHT(raw, ok, temperature_max):
+    raw = raw.astype(np.int64)
+    status = raw[:, 0]
+    # Not busy and calibrated
+    ok = ok & ((status & 0x80) == 0) & ((status & 0x08) != 0)
+    humidity_data = (raw[:, 1] << 12) + (raw[:, 2] << 4) + (raw[:, 3] & 0xf0)
+    temperature_data = ((raw[:, 3] & 0x0f) << 16) + (raw[:, 4] << 8) + raw[:, 5]
+    humidity = humidity_data / (2**20) * 100
+    temperature = temperature_data / (2**20) * 200 - 50 - 1
+    ok &= (-40 <= temperature) & (temperature <= temperature_max) & (0 <= humidity) & (humidity <= 100)
+    return {
+            'humidity': np.where(ok, humidity, -1),
+            'temperature': np.where(ok, temperature, -1),
+            }
+
+
+def decodeAHT10(raw, ok, info):
+    return _decodeAHT(raw, ok, 85)
+
+
+def decodeAHT21(raw, ok, info):
+    return _decodeAHT(raw, ok, 120)
+
+
+def decodeMCP9808(raw, ok, info):
+    raw = raw.astype(np.int64)
+    temperature = ((raw[:, 0] & 0x0f) * 2**4) + (raw[:, 1] * 2.0**-4)
+    ok = ok & (-40 <= temperature) & (temperature <= 125)
+    return {'temperature': np.where(ok, temperature, -1)}
+
+
+def decodeCCS811(raw, ok, info):
+    raw = raw.astype(np.int64)
+    status = raw[:, 4]
+    # No error, new data, valid firmware and application mode
+    ok = ok & ((status & 0x01) == 0) & ((status & 0x98) == 0x98)
+    eTVOC = (raw[:, 2] << 8) + raw[:, 3]
+    ok &= eTVOC <= 32768
+    return {'eTVOC': np.where(ok, eTVOC, -1)}
+
+
+# IAQ is not decoded, as it depends on the history of the sensor
+def decodeBME680(raw, ok, info):
+    regs = raw[:, :constants.FIELD_LENGTH]
+    ok = ok & ((regs[:, 0] & constants.NEW_DATA_MSK) != 0)
+    values = bme680_batch.compensateFieldData(SimpleNamespace(**info['calibration']), regs,
+            info['variant'], info['offset_temp_in_t_fine'])
+    return {k: np.where(ok, v, -1) for k, v in values.items()}
+
+
+DECODER_DICT = {
+        'AHT10': decodeAHT10,
+        'AHT21': decodeAHT21,
+        'MCP9808': decodeMCP9808,
+        'CCS811': decodeCCS811,
+        'BME680': decodeBME680,
+        }
+
+
+# -------------------------
+# Read all records of a capture file, without a record cut by a crash.
+# Return the header and the record array
+def readRecords(filename):
+    with open(filename, 'rb') as capture_file:
+        header, offset = readHeader(capture_file)
+    record_array = np.fromfile(filename, dtype=np.uint8, offset=offset)
+    record_cnt = len(record_array) // RECORD_SIZE
+    return header, record_array[:record_cnt * RECORD_SIZE].view(RECORD_DTYPE)
+
+
+# Decode a capture file into {device name: {'time': ns array, value name: array}}.
+# Devices of the same name are device name[device id].
+# Header entries of calibration_dict replace the captured ones, {device name: calibration dict}
+def readCapture(filename, calibration_dict=None):
+    header, record_array = readRecords(filename)
+    name_list = [device['name'] for device in header['devices']]
+    result_dict = {}
+    for device in header['devices']:
+        decoder = DECODER_DICT.get(device['name'])
+        if decoder is None:
+            continue
+        if calibration_dict and device['name'] in calibration_dict:
+            device = {**device, 'calibration': calibration_dict[device['name']]}
+        device_array = record_array[record_array['device'] == device['id']]
+        result = {'time': device_array['time']}
+        result.update(decoder(device_array['raw'], device_array['size'] > 0, device))
+        key = device['name'] if name_list.count(device['name']) == 1 else f"{device['name']}[{device['id']}]"
+        result_dict[key] = result
+    return result_dict
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode a raw capture file.')
+    parser.add_argument('filename', help='Capture file name')
+    parser.add_argument('--csv', help='Write values to this CSV file: name, time in ns, value name, value')
+    args = parser.parse_args()
+
+    result_dict = readCapture(args.filename)
+    for name, result in result_dict.items():
+        print(f"{name}: {len(result['time'])} records")
+        for k, v in result.items():
+            if k == 'time' or len(v) == 0:
+                continue
+            valid = v[v != -1]
+            mean = valid.mean() if len(valid) else float('nan')
+            print(f'    {k}: {len(valid)} valid, mean {mean:.3f}')
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['name', 'time', 'field', 'value'])
+            for name, result in result_dict.items():
+                for k, v in result.items():
+                    if k == 'time':
+                        continue
+                    for time_ns, value in zip(result['time'].tolist(), v.tolist()):
+                        writer.writerow([name, time_ns, k, value])
+
+
+if __name__ == "__main__":
+    # execute only if run as a script
+    main()
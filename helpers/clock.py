@@ -0,0 +1,31 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/clock.py
+"""
+Wall-clock timestamps in nanoseconds, which follow the monotonic clock
+"""
+
+import time
+
+
+# Re-align to the wall clock every hour, to follow NTP adjustments
+_ALIGN_INTERVAL_NS = 3600 * 10**9
+
+_offset_ns = 0
+_aligned_ns = None
+
+
+def alignClock():
+    global _offset_ns, _aligned_ns
+    _aligned_ns = time.monotonic_ns()
+    _offset_ns = time.time_ns() - _aligned_ns
+
+
+# Unix time in nanoseconds.
+# Between alignments it never steps back, even when the wall clock is set
+def getTimeNs():
+    monotonic_ns = time.monotonic_ns()
+    if _aligned_ns is None or monotonic_ns - _aligned_ns > _ALIGN_INTERVAL_NS:
+        alignClock()
+        monotonic_ns = time.monotonic_ns()
+    return monotonic_ns + _offset_ns
@@ -0,0 +1,122 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/collector.py
+"""
+Poll sensors in two phases, so their conversions overlap,
+and poll each I2C bus in parallel, or all sensors on one asyncio event loop
+"""
+
+import asyncio, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from helpers.clock import getTimeNs
+
+
+# Trigger every sensor first, wait once for the slowest conversion,
+# then collect them all.
+# Cycle latency is the slowest conversion time, not the sum of them.
+# With is_raw, results have raw register bytes as 'raw' instead of 'measures',
+# and 'sensor_id', id() of the sensor, as devices of the same name can be on several buses
+def collectCycle(sensor_list, is_raw=False):
+    # Trigger measurement
+    deadline = time.monotonic()
+    for sensor in sensor_list:
+        sensor.trigger()
+        deadline = max(deadline, time.monotonic() + sensor.wait_second)
+
+    # Wait for the longest conversion
+    sleep_time = deadline - time.monotonic()
+    if sleep_time > 0:
+        time.sleep(sleep_time)
+
+    # Collect results, stamped when each read completes
+    result_list = []
+    for sensor in sensor_list:
+        if is_raw:
+            result_list.append({
+                'name': sensor.name,
+                'sensor_id': id(sensor),
+                'time': getTimeNs(),
+                'raw': sensor.collectRaw(),
+                })
+            continue
+        measures = sensor.collect()
+        result_list.append({
+            'name': sensor.name,
+            'time': getTimeNs(),
+            'measures': measures,
+            })
+    return result_list
+
+
+async def _measureAsync(sensor):
+    measures = await sensor.measureAsync()
+    return {'name': sensor.name, 'time': getTimeNs(), 'measures': measures}
+
+
+# Measure every sensor concurrently on the event loop,
+# and return one cycle record as BusPoller.collect does
+async def collectCycleAsync(sensor_list):
+    cycle_time = datetime.now()
+    result_list = await asyncio.gather(
+            *[_measureAsync(sensor) for sensor in sensor_list]
+            )
+    return {'time': cycle_time, 'results': list(result_list)}
+
+
+# =================================================
+class BusPoller:
+    """
+    Poll sensors with one worker per I2C bus.
+    Sensors on the same bus are polled by collectCycle on its worker,
+    so the cycle time is the one of the busiest bus.
+    With is_raw, sensors are collected as raw register bytes, see collectCycle.
+    """
+    def __init__(self, sensor_list, is_raw=False):
+        self._sensor_list = sensor_list
+        self._is_raw = is_raw
+
+        # Group sensors by bus, keeping config.json order
+        self._bus_dict = {}
+        for sensor in sensor_list:
+            self._bus_dict.setdefault(sensor.bus, []).append(sensor)
+
+        self._executor = ThreadPoolExecutor(
+                max_workers=max(len(self._bus_dict), 1),
+                thread_name_prefix='i2c-bus'
+                )
+
+    @property
+    def bus_list(self):
+        return list(self._bus_dict)
+
+    # Poll all buses once, and merge results into one cycle record.
+    # sensor_list polls only those sensors, such as the ones due in Scheduler
+    def collect(self, sensor_list=None):
+        cycle_time = datetime.now()
+
+        if sensor_list is None:
+            sensor_list = self._sensor_list
+            bus_dict = self._bus_dict
+        else:
+            bus_dict = {}
+            for sensor in sensor_list:
+                bus_dict.setdefault(sensor.bus, []).append(sensor)
+
+        future_list = [
+                self._executor.submit(collectCycle, bus_sensor_list, self._is_raw)
+                for bus_sensor_list in bus_dict.values()
+                ]
+
+        # Merge back into the order of sensor_list
+        result_dict = {}
+        for bus_sensor_list, future in zip(bus_dict.values(), future_list):
+            for sensor, result in zip(bus_sensor_list, future.result()):
+                result_dict[id(sensor)] = result
+        result_list = [result_dict[id(sensor)] for sensor in sensor_list]
+
+        return {'time': cycle_time, 'results': result_list}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -1,12 +1,18 @@
 import logging, os
 import influxdb_client
+from influxdb_client import WritePrecision
 from influxdb_client.client.write_api import SYNCHRONOUS
 
+from helpers.lineprotocol import LineProtocolSerializer
+
 class InfluxDBClient:
-    def __init__(self):
+    def __init__(self, name_list=()):
         self._bucket    = "myroom"
         self._org       = "newini"
 
+        # Line protocol prefixes of the devices are computed once
+        self._serializer = LineProtocolSerializer(name_list)
+
         client = influxdb_client.InfluxDBClient(
             url     = "http://192.168.7.25:8086",
             token   = os.environ['INFLUXDB_TOKEN'],
@@ -15,9 +21,19 @@ class InfluxDBClient:
 
         self._write_api = client.write_api(write_options=SYNCHRONOUS)
 
-    def write(self, point, field, value):
-        p = influxdb_client.Point(point).field(field, value)
+    # Write result list of one or several cycles in one request,
+    # serialized by LineProtocolSerializer without building Point objects
+    def writeResults(self, result_list):
+        lines = self._serializer.serialize(result_list)
+        if not lines:
+            return True
         try:
-            self._write_api.write(bucket=self._bucket, org=self._org, record=p)
+            # write_api takes line protocol as bytes or str, and iterates other sequences,
+            # so the buffer is copied once here. A single bytes record is sent as it is
+            self._write_api.write(bucket=self._bucket, org=self._org, record=bytes(lines),
+                    write_precision=WritePrecision.NS)
         except Exception as e:
-            logging.error('Cannot write to InfluxDB server. %s' % e)
+            logging.error('Cannot write %d results to InfluxDB server. %s' % (len(result_list), e))
+            return False
+        return True
+
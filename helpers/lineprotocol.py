@@ -0,0 +1,89 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/lineprotocol.py
+"""
+Serialize results to InfluxDB line protocol, without influxdb_client.Point
+"""
+
+import math
+
+
+def _escapeMeasurement(name):
+    return name.replace('\\', '\\\\').replace(',', '\\,').replace(' ', '\\ ')
+
+
+def _escapeKey(key):
+    return key.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+class LineProtocolSerializer:
+    """
+    Serialize results into a reusable buffer, one line per result:
+        <measurement>[,<tag>=<value>...] <field>=<value>,... [<time in ns>]
+    The measurement/tag prefix of each device is computed once.
+    Field values are written as influxdb_client.Point does, so the field types do not change:
+    int as 123i, float as str(value), bool as true/false.
+    Value -1 means the device failed to measure, so it is skipped, as well as NaN and inf.
+    """
+    def __init__(self, name_list=(), tag_dict=None):
+        self._tag_dict = tag_dict if tag_dict is not None else {}
+        self._prefix_dict = {}
+        self._field_key_dict = {}
+        for name in name_list:
+            self._getPrefix(name)
+        self._buffer = bytearray()
+
+    def _getPrefix(self, name):
+        prefix = self._prefix_dict.get(name)
+        if prefix is None:
+            prefix = _escapeMeasurement(name)
+            for k, v in sorted(self._tag_dict.items()):
+                prefix += f',{_escapeKey(k)}={_escapeKey(str(v))}'
+            prefix = (prefix + ' ').encode()
+            self._prefix_dict[name] = prefix
+        return prefix
+
+    def _getFieldKey(self, key):
+        field_key = self._field_key_dict.get(key)
+        if field_key is None:
+            field_key = (_escapeKey(key) + '=').encode()
+            self._field_key_dict[key] = field_key
+        return field_key
+
+    # Return the line protocol bytes of result list of one or several cycles.
+    # It is the reusable buffer itself, not a copy, so it is valid until the next call
+    def serialize(self, result_list):
+        buffer = self._buffer
+        del buffer[:]
+        for result in result_list:
+            is_first = True
+            for k, v in result['measures'].items():
+                if v == -1:
+                    continue
+                if isinstance(v, bool):
+                    value = b'true' if v else b'false'
+                elif isinstance(v, int):
+                    value = b'%di' % v
+                elif isinstance(v, float):
+                    if not math.isfinite(v):
+                        continue
+                    value = str(v).encode()
+                else:
+                    value = ('"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"').encode()
+
+                if is_first:
+                    buffer += self._getPrefix(result['name'])
+                    is_first = False
+                else:
+                    buffer += b','
+                buffer += self._getFieldKey(k)
+                buffer += value
+
+            # No line when all measures are skipped
+            if is_first:
+                continue
+            time_ns = result.get('time')
+            if time_ns is not None:
+                buffer += b' %d' % time_ns
+            buffer += b'\n'
+        return buffer
@@ -0,0 +1,235 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/ringbuffer.py
+"""
+Ring buffer of recent readings in a memory-mapped file,
+written by the collector (i2c.py) and read by the webserver and other local tools.
+
+There is one writer and any number of readers, without locks:
+- every reading has a sequence number, starting from 1
+- a slot holds one reading, between two copies of its sequence number, as a seqlock.
+  The writer stores the leading copy, the reading, then the trailing copy, as three separate stores.
+  A reader reads the trailing copy, the reading, then the leading copy,
+  so it knows a slot is torn or overwritten when the copies are not its sequence number
+- the writer publishes the last sequence number in the header after its slots
+
+File layout:
+- header of HEADER_SIZE bytes: MAGIC, slot count, key max, key count, last sequence number
+- key table of key max entries: device name and field name, KEY_NAME_SIZE bytes each, null padded
+- slots of SLOT_SIZE bytes: sequence number, time in ns, key index, value, sequence number
+
+Print the latest readings
+    python3 -m helpers.ringbuffer
+"""
+
+import argparse, mmap, os, struct, tempfile
+
+
+# On tmpfs when there is, so readings never go to the SD card
+DEFAULT_FILENAME = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'i2c.ring')
+
+MAGIC = b'I2CRING1'
+HEADER_FORMAT = '<8sIIIxxxxQ'
+HEADER_SIZE = 64
+KEY_COUNT_OFFSET = struct.calcsize('<8sII')
+SEQ_OFFSET = struct.calcsize(HEADER_FORMAT) - 8
+KEY_NAME_SIZE = 32
+KEY_FORMAT = f'<{KEY_NAME_SIZE}s{KEY_NAME_SIZE}s'
+KEY_SIZE = struct.calcsize(KEY_FORMAT)
+SLOT_FORMAT = '<QqHxxxxxxdQ'
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+SEQ_FORMAT = '<Q'
+SEQ_SIZE = struct.calcsize(SEQ_FORMAT)
+# Reading between the two sequence numbers of a slot
+PAYLOAD_FORMAT = '<qHxxxxxxd'
+PAYLOAD_SIZE = SLOT_SIZE - 2 * SEQ_SIZE
+assert struct.calcsize(PAYLOAD_FORMAT) == PAYLOAD_SIZE
+
+
+def _getFileSize(slot_count, key_max):
+    return HEADER_SIZE + key_max * KEY_SIZE + slot_count * SLOT_SIZE
+
+
+# =================================================
+class RingWriter:
+    """
+    The only writer of a ring buffer file.
+    An existing file of the same layout is continued, so readers keep their keys and sequence numbers
+    over restarts of the collector. Otherwise it is replaced by a new file,
+    as resizing a file mapped by readers would crash them.
+    """
+    def __init__(self, filename=DEFAULT_FILENAME, slot_count=4096, key_max=256):
+        self.slot_count = slot_count
+        self._key_max = key_max
+        self._slot_offset = HEADER_SIZE + key_max * KEY_SIZE
+        file_size = _getFileSize(slot_count, key_max)
+
+        if os.path.exists(filename) and os.path.getsize(filename) != file_size:
+            os.unlink(filename)
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != file_size:
+                os.ftruncate(fd, file_size)
+            self._mmap = mmap.mmap(fd, file_size)
+        finally:
+            os.close(fd)
+
+        magic, old_slot_count, old_key_max, key_count, seq = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if (magic, old_slot_count, old_key_max) != (MAGIC, slot_count, key_max):
+            self._mmap[:] = bytes(file_size)
+            key_count = seq = 0
+            struct.pack_into(HEADER_FORMAT, self._mmap, 0, MAGIC, slot_count, key_max, 0, 0)
+
+        self._seq = seq
+        self._key_dict = {}
+        for index in range(key_count):
+            device, field = struct.unpack_from(KEY_FORMAT, self._mmap, HEADER_SIZE + index * KEY_SIZE)
+            self._key_dict[(device.rstrip(b'\0').decode(), field.rstrip(b'\0').decode())] = index
+
+    # Key index of device and field, added to the key table when it is new
+    def _getKeyIndex(self, device, field):
+        index = self._key_dict.get((device, field))
+        if index is None:
+            index = len(self._key_dict)
+            if index >= self._key_max:
+                raise ValueError(f'Ring buffer has no room for key {device}.{field}')
+            struct.pack_into(KEY_FORMAT, self._mmap, HEADER_SIZE + index * KEY_SIZE,
+                    device.encode()[:KEY_NAME_SIZE], field.encode()[:KEY_NAME_SIZE])
+            # Count is published after the entry
+            struct.pack_into('<I', self._mmap, KEY_COUNT_OFFSET, index + 1)
+            self._key_dict[(device, field)] = index
+        return index
+
+    # Write measures of result list, as of collectCycle.
+    # Value -1 means the device failed to measure, so it is skipped
+    def write(self, result_list):
+        for result in result_list:
+            for field, value in result['measures'].items():
+                if value == -1:
+                    continue
+                key_index = self._getKeyIndex(result['name'], field)
+                self._seq += 1
+                offset = self._slot_offset + (self._seq % self.slot_count) * SLOT_SIZE
+                # Leading sequence number, reading, then trailing sequence number
+                struct.pack_into(SEQ_FORMAT, self._mmap, offset, self._seq)
+                struct.pack_into(PAYLOAD_FORMAT, self._mmap, offset + SEQ_SIZE, result['time'], key_index, value)
+                struct.pack_into(SEQ_FORMAT, self._mmap, offset + SEQ_SIZE + PAYLOAD_SIZE, self._seq)
+        struct.pack_into(SEQ_FORMAT, self._mmap, SEQ_OFFSET, self._seq)
+
+    def close(self):
+        self._mmap.close()
+
+
+# =================================================
+class RingReader:
+    """
+    Read a ring buffer file written by RingWriter, from any process.
+    Readings are read from the mapped memory, without a copy of the file.
+    A file replaced by the writer is opened again.
+    """
+    def __init__(self, filename=DEFAULT_FILENAME):
+        self._filename = filename
+        self._mmap = None
+        self._open()
+
+    def _open(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        with open(self._filename, 'rb') as ring_file:
+            self._inode = os.fstat(ring_file.fileno()).st_ino
+            self._mmap = mmap.mmap(ring_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slot_count, key_max, key_count, seq = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'Not a ring buffer file: {self._filename}')
+        self._slot_offset = HEADER_SIZE + key_max * KEY_SIZE
+        self._key_list = []
+
+    def _reopenIfReplaced(self):
+        if os.stat(self._filename).st_ino != self._inode:
+            self._open()
+
+    @property
+    def seq(self):
+        return struct.unpack_from(SEQ_FORMAT, self._mmap, SEQ_OFFSET)[0]
+
+    def _getKeyCount(self):
+        return struct.unpack_from('<I', self._mmap, KEY_COUNT_OFFSET)[0]
+
+    def _getKey(self, index):
+        # Keys are only appended, so only new ones are read
+        if index >= len(self._key_list):
+            key_count = self._getKeyCount()
+            for i in range(len(self._key_list), key_count):
+                device, field = struct.unpack_from(KEY_FORMAT, self._mmap, HEADER_SIZE + i * KEY_SIZE)
+                self._key_list.append((device.rstrip(b'\0').decode(), field.rstrip(b'\0').decode()))
+        return self._key_list[index]
+
+    # Reading of sequence number seq, as (time in ns, device, field, value),
+    # or None when it is torn or already overwritten
+    def _readSlot(self, seq):
+        offset = self._slot_offset + (seq % self.slot_count) * SLOT_SIZE
+        # In the reverse order of the writer: trailing sequence number, reading, then leading sequence number
+        seq_end, = struct.unpack_from(SEQ_FORMAT, self._mmap, offset + SEQ_SIZE + PAYLOAD_SIZE)
+        if seq_end != seq:
+            return None
+        time_ns, key_index, value = struct.unpack_from(PAYLOAD_FORMAT, self._mmap, offset + SEQ_SIZE)
+        seq_begin, = struct.unpack_from(SEQ_FORMAT, self._mmap, offset)
+        if seq_begin != seq:
+            return None
+        device, field = self._getKey(key_index)
+        return time_ns, device, field, value
+
+    # Readings after sequence number since_seq, oldest first, as (seq, time in ns, device, field, value).
+    # Return them and the last sequence number, to be given as since_seq of the next call.
+    # Readings overwritten before being read are lost, and a restarted ring is read from the start
+    def readSince(self, since_seq=0):
+        self._reopenIfReplaced()
+        last_seq = self.seq
+        if since_seq > last_seq:
+            since_seq = 0
+        reading_list = []
+        for seq in range(max(since_seq + 1, last_seq - self.slot_count + 1, 1), last_seq + 1):
+            reading = self._readSlot(seq)
+            if reading is not None:
+                reading_list.append((seq,) + reading)
+        return reading_list, last_seq
+
+    # Latest reading of each device and field, as {device: {field: (time in ns, value)}}.
+    # Slots are read from the newest, until every key is found
+    def getLatest(self):
+        self._reopenIfReplaced()
+        latest_dict = {}
+        key_count = self._getKeyCount()
+        found_cnt = 0
+        last_seq = self.seq
+        for seq in range(last_seq, max(last_seq - self.slot_count, 0), -1):
+            reading = self._readSlot(seq)
+            if reading is None:
+                continue
+            time_ns, device, field, value = reading
+            field_dict = latest_dict.setdefault(device, {})
+            if field not in field_dict:
+                field_dict[field] = (time_ns, value)
+                found_cnt += 1
+                if found_cnt >= key_count:
+                    break
+        return latest_dict
+
+    def close(self):
+        self._mmap.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the latest readings of a ring buffer file.')
+    parser.add_argument('--filename', default=DEFAULT_FILENAME, help='Ring buffer file name')
+    args = parser.parse_args()
+
+    reader = RingReader(args.filename)
+    for device, field_dict in reader.getLatest().items():
+        for field, (time_ns, value) in field_dict.items():
+            print(f'{device} {field}: {value} at {time_ns}')
+
+
+if __name__ == "__main__":
+    # execute only if run as a script
+    main()
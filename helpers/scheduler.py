@@ -0,0 +1,116 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/scheduler.py
+"""
+Deadline-driven scheduler to poll each sensor at its own interval
+"""
+
+import heapq, math, time
+
+
+class TimingStats:
+    """
+    Running count, mean, standard deviation and max of a value in second,
+    by Welford's algorithm
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.max = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.max = max(self.max, value)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def toDict(self):
+        return {'count': self.count, 'mean': self.mean, 'stdev': self.stdev, 'max': self.max}
+
+
+# =================================================
+class Scheduler:
+    """
+    Keep a heap of the next due time of each sensor, on the monotonic clock.
+    The interval is sensor.interval in seconds, or default_interval when it is None.
+    Due times stay on the grid of start + n * interval, so they never drift.
+
+    Timing is measured for every poll:
+    - jitter: how late a sensor is polled after its due time
+    - late: polls later than late_tolerance
+    - skipped: due times passed without polling, because polling was too late
+    - overrun: cycles which ended after the next due time, so no sleep before the next cycle
+    """
+    def __init__(self, sensor_list, default_interval, late_tolerance=0.01):
+        self._late_tolerance = late_tolerance
+        self._heap = []
+        now = time.monotonic()
+        # Index is the tie breaker, and keeps config.json order
+        for index, sensor in enumerate(sensor_list):
+            interval = sensor.interval if sensor.interval else default_interval
+            heapq.heappush(self._heap, (now, index, interval, sensor))
+
+        self.jitter_stats = TimingStats()
+        self.overrun_stats = TimingStats()
+        self.late_cnt = 0
+        self.skipped_cnt = 0
+
+    # Pop all sensors which are due, and schedule their next due time
+    def popDue(self):
+        now = time.monotonic()
+        entry_list = []
+        while self._heap and self._heap[0][0] <= now:
+            entry_list.append(heapq.heappop(self._heap))
+
+        # Sort by index, so that sensors are polled in config.json order
+        entry_list.sort(key=lambda entry: entry[1])
+        sensor_list = []
+        for due, index, interval, sensor in entry_list:
+            sensor_list.append(sensor)
+
+            late_second = now - due
+            self.jitter_stats.add(late_second)
+            if late_second > self._late_tolerance:
+                self.late_cnt += 1
+
+            next_due = due + interval
+            # Skip the slots already passed, when polling was late
+            if next_due <= now:
+                skipped_cnt = int((now - next_due) // interval) + 1
+                next_due += interval * skipped_cnt
+                self.skipped_cnt += skipped_cnt
+            heapq.heappush(self._heap, (next_due, index, interval, sensor))
+        return sensor_list
+
+    # Second till the next due sensor
+    def getSleepSecond(self):
+        if not self._heap:
+            return 0
+        sleep_second = self._heap[0][0] - time.monotonic()
+        if sleep_second < 0:
+            self.overrun_stats.add(-sleep_second)
+            return 0
+        return sleep_second
+
+    def getStats(self):
+        return {
+                'jitter': self.jitter_stats.toDict(),
+                'overrun': self.overrun_stats.toDict(),
+                'late': self.late_cnt,
+                'skipped': self.skipped_cnt,
+                }
+
+    def resetStats(self):
+        self.jitter_stats.reset()
+        self.overrun_stats.reset()
+        self.late_cnt = 0
+        self.skipped_cnt = 0
@@ -0,0 +1,310 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/sensors.py
+"""
+Wrap each I2C device driver with a common trigger/collect interface
+"""
+
+import asyncio, logging, time
+
+# Device
+from devices.aht10 import AHT10
+from devices.aht21 import AHT21
+from devices.ccs811 import CCS811
+from devices.mcp9809 import MCP9808
+from devices import bme680_example as BME680
+
+
+# =================================================
+class HardwareBackend:
+    """
+    Real I2C buses, /dev/i2c-N.
+    Another backend, such as devices.simbus.SimBackend, can be used instead
+    """
+    def getI2CDevice(self, bus_n, addr):
+        from pyi2c import I2CDevice
+        return I2CDevice(bus_n, addr)
+
+    # smbus2 supports combined transactions by i2c_rdwr
+    def getSMBus(self, bus_n):
+        import smbus2
+        return smbus2.SMBus(bus_n)
+
+
+# =================================================
+class Sensor:
+    """
+    A device polled in two phases.
+    trigger() starts a conversion and collect() returns its measures,
+    after at least wait_second from the trigger.
+    """
+    wait_second = 0
+
+    def __init__(self, config_device, backend):
+        self.name = config_device['name']
+        self.bus = config_device['bus']
+        self.address = int(config_device['address'], 16) if 'address' in config_device else None
+        # Sampling interval in second. None to use the default interval
+        self.interval = config_device.get('interval')
+        self._backend = backend
+
+    # Address in config.json, or the default address of the device
+    def getAddress(self, default_addr):
+        return self.address if self.address is not None else default_addr
+
+    def trigger(self):
+        pass
+
+    def collect(self):
+        return {}
+
+    # Trigger, wait and collect without blocking the event loop
+    async def measureAsync(self):
+        self.trigger()
+        await asyncio.sleep(self.wait_second)
+        return self.collect()
+
+    # Raw register bytes of the measurement instead of measures, for capture mode.
+    # None means the read failed
+    def collectRaw(self):
+        return None
+
+    # What is needed to decode raw bytes later, besides the device name, such as calibration
+    def getCaptureInfo(self):
+        return {}
+
+
+# =================================================
+class AHT10Sensor(Sensor):
+    def __init__(self, config_device, backend):
+        super().__init__(config_device, backend)
+        addr = self.getAddress(0x38)
+        self._aht10 = AHT10(self.bus, addr, backend.getI2CDevice(self.bus, addr))
+        self._aht10.initialize()
+        self.wait_second = self._aht10.MEAS_WAIT_SECOND
+
+    def trigger(self):
+        self._aht10.triggerMeasurement()
+
+    def collect(self):
+        return self._measures(*self._aht10.readHumidityTemperature())
+
+    async def measureAsync(self):
+        return self._measures(*await self._aht10.getHumidityTemperatureAsync())
+
+    def collectRaw(self):
+        read_data = self._aht10.readRaw()
+        # Only check the status, which recovers the device when needed
+        if read_data is not None:
+            self._aht10.checkStatus(read_data[0])
+        return read_data
+
+    def _measures(self, humidity, temperature):
+        logging.info(f'AHT10: Humid: {humidity:.0f}±2%, Tempe: {temperature:.1f}±0.3°C')
+        return {'humidity': humidity, 'temperature': temperature}
+
+
+# =================================================
+class AHT21Sensor(Sensor):
+    def __init__(self, config_device, backend):
+        super().__init__(config_device, backend)
+        addr = self.getAddress(0x38)
+        self._aht21 = AHT21(self.bus, addr, backend.getI2CDevice(self.bus, addr))
+        #self._aht21.initialize()
+        self.wait_second = self._aht21.MEAS_WAIT_SECOND
+
+    def trigger(self):
+        self._aht21.triggerMeasurement()
+
+    def collect(self):
+        return self._measures(*self._aht21.readHumidityTemperature())
+
+    async def measureAsync(self):
+        return self._measures(*await self._aht21.getHumidityTemperatureAsync())
+
+    def collectRaw(self):
+        read_data = self._aht21.readRaw()
+        # Only check the status, which recovers the device when needed
+        if read_data is not None:
+            self._aht21.checkStatus(read_data[0])
+        return read_data
+
+    def _measures(self, humidity, temperature):
+        logging.info(f'AHT21: humidity: {humidity:.0f}±2%, Tempe: {temperature:.1f}±0.3°C')
+        return {'humidity': humidity, 'temperature': temperature}
+
+
+# =================================================
+class CCS811Sensor(Sensor):
+    """
+    CCS811 measures every second by itself, so there is nothing to trigger.
+    """
+    def __init__(self, config_device, backend):
+        super().__init__(config_device, backend)
+        addr = self.getAddress(0x5a)
+        self._ccs811 = CCS811(self.bus, addr, backend.getI2CDevice(self.bus, addr))
+        self._ccs811.initialize()
+
+    def collect(self):
+        eCO2, eTVOC = self._ccs811.getECO2ETVOC() # Not use eCO2 value
+        logging.info(f'CCS811: eTVOC: {eTVOC} ppb')
+        return {'eTVOC': eTVOC}
+
+    # On a bad status, collect() resets and initializes the device with time.sleep,
+    # so it runs on a worker thread, not to block the event loop
+    async def measureAsync(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self.collect)
+
+    def collectRaw(self):
+        read_data = self._ccs811.readRaw()
+        # Only check the status, which recovers the device when needed
+        if read_data is not None:
+            self._ccs811.interpretStatus(read_data[4], read_data[5])
+        return read_data
+
+
+# =================================================
+class MCP9808Sensor(Sensor):
+    """
+    MCP9808 converts continuously, so there is nothing to trigger.
+    """
+    def __init__(self, config_device, backend):
+        super().__init__(config_device, backend)
+        addr = self.getAddress(0x18)
+        self._mcp9808 = MCP9808(self.bus, addr, backend.getI2CDevice(self.bus, addr))
+        self._mcp9808.initialize()
+
+    def collect(self):
+        temperature = self._mcp9808.getTemperature()
+        logging.info(f'MCP9808: temperature: {temperature:.1f}±0.25°C')
+        return {'temperature': temperature}
+
+    def collectRaw(self):
+        return self._mcp9808.readRaw()
+
+
+# =================================================
+class BME680Sensor(Sensor):
+    """
+    BME680 with a simple IAQ score from humidity and gas resistance baselines
+    """
+    def __init__(self, config_device, backend):
+        super().__init__(config_device, backend)
+        # Reset and configuration are skipped when the device holds the settings already
+        self._bme680 = BME680.BME680(self.getAddress(BME680.I2C_ADDR_SECONDARY), backend.getSMBus(self.bus),
+                settings={
+                    'os_hum': BME680.OS_2X,
+                    'os_pres': BME680.OS_4X,
+                    'os_temp': BME680.OS_8X,
+                    'filter_size': BME680.FILTER_SIZE_3,
+                    'gas_status': BME680.ENABLE_GAS_MEAS,
+                    'heater_temperature': 320,
+                    'heater_duration': 150,
+                    'nb_profile': 0,
+                    })
+        if self._bme680.is_warm_start:
+            logging.info('BME680: warm start, configuration is kept')
+        self._is_triggered = False
+        self._start_time = time.time()
+        self._burn_in_time = 300
+        self._gas_res_list = []
+        self._humidity_list = []
+        self._gas_res_baseline = 0
+        self._humidity_baseline = 0
+        self._humidity_weight = 0.25
+
+    @property
+    def wait_second(self):
+        return self._bme680.get_measurement_wait()
+
+    # smbus raises OSError on a failed transfer, while pyi2c drivers log it and go on.
+    # It is caught here, so that a failure gives -1 measures or None raw bytes as theirs do
+    def trigger(self):
+        try:
+            self._bme680.trigger_measurement()
+            self._is_triggered = True
+        except OSError as e:
+            logging.error(f'BME680: cannot trigger measurement. {e}')
+            self._is_triggered = False
+
+    def collect(self):
+        return self._measures(self._is_triggered and self._tryRead(self._bme680.collect_sensor_data))
+
+    async def measureAsync(self):
+        try:
+            is_ok = await self._bme680.get_sensor_data_async()
+        except OSError as e:
+            logging.error(f'BME680: cannot measure. {e}')
+            is_ok = False
+        return self._measures(is_ok)
+
+    def collectRaw(self):
+        return self._tryRead(self._bme680.collect_raw_data) if self._is_triggered else None
+
+    # Result of read function, or None when the transfer failed
+    def _tryRead(self, read_function):
+        try:
+            return read_function()
+        except OSError as e:
+            logging.error(f'BME680: cannot read field data. {e}')
+            return None
+
+    # Field data are compensated with the calibration of this device.
+    # t_fine is a result of the last measurement, not calibration
+    def getCaptureInfo(self):
+        calibration = {k: v for k, v in vars(self._bme680.calibration_data).items() if k != 't_fine'}
+        return {
+                'calibration': calibration,
+                'variant': self._bme680._variant,
+                'offset_temp_in_t_fine': self._bme680.offset_temp_in_t_fine,
+                }
+
+    def _measures(self, is_ok):
+        humidity = temperature = pressure = iaq = -1
+        if is_ok:
+            temperature = self._bme680.data.temperature
+            pressure = self._bme680.data.pressure
+            humidity = self._bme680.data.humidity
+            if self._bme680.data.heat_stable:
+                gas_resistance = self._bme680.data.gas_resistance
+                curr_time = time.time()
+                if curr_time - self._start_time < self._burn_in_time:
+                    self._humidity_list.append(humidity)
+                    self._gas_res_list.append(gas_resistance)
+                else:
+                    if self._gas_res_baseline == 0:
+                        self._gas_res_baseline = sum(self._gas_res_list)/len(self._gas_res_list)
+                    if self._humidity_baseline == 0:
+                        self._humidity_baseline = sum(self._humidity_list)/len(self._humidity_list)
+                    humidity_score = humidity/self._humidity_baseline * self._humidity_weight * 100
+                    gas_res_score = gas_resistance/self._gas_res_baseline * (1-self._humidity_weight) * 100
+                    iaq = humidity_score + gas_res_score
+        logging.info(f"""BME680:
+                Humid: {humidity:.0f}±3%, Tempe: {temperature:.1f}±1°C,
+                Press: {pressure}hPa, IAQ: {iaq}"""
+                )
+        return {
+                'humidity': humidity, 'temperature': temperature,
+                'pressure': pressure, 'iaq': iaq
+                }
+
+
+# =================================================
+SENSOR_CLASS_DICT = {
+        'AHT10': AHT10Sensor,
+        'AHT21': AHT21Sensor,
+        'CCS811': CCS811Sensor,
+        'MCP9808': MCP9808Sensor,
+        'BME680': BME680Sensor,
+        }
+
+
+# Create the sensor of a config.json device entry, on the buses of backend.
+# Return None for devices which are not sensors, such as SSD1306
+def createSensor(config_device, backend=None):
+    sensor_class = SENSOR_CLASS_DICT.get(config_device['name'])
+    if sensor_class is None:
+        return None
+    if backend is None:
+        backend = HardwareBackend()
+    return sensor_class(config_device, backend)
@@ -0,0 +1,112 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/spool.py
+"""
+Durable on-disk spool of results, in SQLite WAL mode.
+Results land here first, and are removed only after they are uploaded.
+"""
+
+import argparse, json, logging, sqlite3, sys, threading
+
+
+class Spool:
+    """
+    A queue of results in a SQLite file, used by Uploader as its queue.
+    The same interface as uploader.MemoryQueue:
+    put() appends results, peek() gets the oldest results with their id,
+    and remove() deletes them up to an id once they are uploaded.
+    When there are more than max_size results, the oldest are dropped.
+    """
+    def __init__(self, filename='spool/i2c.sqlite3', max_size=1000000):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+        # Used by sampling and upload threads, guarded by the lock
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL is durable against application crash with NORMAL,
+        # and does not fsync on every commit
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS spool ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'result TEXT NOT NULL)'
+                )
+        self._conn.commit()
+
+        self._size = self._conn.execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+        if self._size:
+            logging.info(f'Spool has {self._size} results to upload')
+
+    def __len__(self):
+        return self._size
+
+    # Return the number of dropped results
+    def put(self, result_list):
+        with self._lock:
+            self._conn.executemany(
+                    'INSERT INTO spool (result) VALUES (?)',
+                    [(json.dumps(result),) for result in result_list]
+                    )
+            self._size += len(result_list)
+            dropped_cnt = 0
+            if self._size > self._max_size:
+                dropped_cnt = self._size - self._max_size
+                self._conn.execute(
+                        'DELETE FROM spool WHERE id IN '
+                        '(SELECT id FROM spool ORDER BY id LIMIT ?)',
+                        (dropped_cnt,)
+                        )
+                self._size = self._max_size
+            self._conn.commit()
+        return dropped_cnt
+
+    # Return list of (id, result) of the oldest results
+    def peek(self, size):
+        with self._lock:
+            row_list = self._conn.execute(
+                    'SELECT id, result FROM spool ORDER BY id LIMIT ?', (size,)
+                    ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in row_list]
+
+    # Remove results up to last_id
+    def remove(self, last_id):
+        with self._lock:
+            cursor = self._conn.execute('DELETE FROM spool WHERE id <= ?', (last_id,))
+            self._size -= cursor.rowcount
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# =================================================
+# Replay the spool to InfluxDB in large chunks, and exit when it is empty
+def main():
+    from helpers.influxdbclient import InfluxDBClient
+
+    parser = argparse.ArgumentParser(description='Drain the spool to InfluxDB.')
+    parser.add_argument('--spool_filename', default='spool/i2c.sqlite3', help='Spool file name')
+    parser.add_argument('--chunk_size', type=int, default=5000, help='Results per request')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+            format='%(asctime)s %(levelname)s %(message)s',
+            level=logging.INFO
+            )
+
+    idc = InfluxDBClient()
+    spool = Spool(args.spool_filename)
+    while len(spool) > 0:
+        batch = spool.peek(args.chunk_size)
+        if not idc.writeResults([result for _, result in batch]):
+            sys.exit(1)
+        spool.remove(batch[-1][0])
+        logging.info(f'Uploaded {len(batch)} results. {len(spool)} left')
+    spool.close()
+
+
+if __name__ == "__main__":
+    # execute only if run as a script
+    main()
@@ -0,0 +1,145 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+# helpers/uploader.py
+"""
+Upload results to InfluxDB on a background thread,
+so a slow or unreachable server never blocks sampling
+"""
+
+import collections, itertools, logging, random, threading, time
+
+
+class MemoryQueue:
+    """
+    A bounded in-memory queue of results.
+    put() appends results, peek() gets the oldest results with their id,
+    and remove() deletes them up to an id once they are uploaded.
+    When there are more than max_size results, the oldest are dropped.
+    """
+    def __init__(self, max_size=10000):
+        self._max_size = max_size
+        self._deque = collections.deque()
+        self._last_id = 0
+
+    def __len__(self):
+        return len(self._deque)
+
+    # Return the number of dropped results
+    def put(self, result_list):
+        dropped_cnt = 0
+        for result in result_list:
+            if len(self._deque) >= self._max_size:
+                self._deque.popleft()
+                dropped_cnt += 1
+            self._last_id += 1
+            self._deque.append((self._last_id, result))
+        return dropped_cnt
+
+    # Return list of (id, result) of the oldest results
+    def peek(self, size):
+        return list(itertools.islice(self._deque, size))
+
+    # Remove results up to last_id
+    def remove(self, last_id):
+        while self._deque and self._deque[0][0] <= last_id:
+            self._deque.popleft()
+
+
+# =================================================
+class Uploader:
+    """
+    Queue results and upload them in batches.
+    A batch is flushed every flush_second, or as soon as flush_size results are queued.
+    When a backlog has built up, it is replayed in chunks of drain_size.
+    On failure, the batch stays queued and is retried with exponential backoff and jitter.
+
+    client needs writeResults(result_list) which returns True on success,
+    such as InfluxDBClient.
+    queue is a MemoryQueue by default, or a spool.Spool to survive restarts.
+    """
+    def __init__(self, client, queue=None, flush_size=100, flush_second=10.0,
+            drain_size=5000, backoff_second=1.0, max_backoff_second=300.0):
+        self._client                = client
+        self._queue                 = queue if queue is not None else MemoryQueue()
+        self._flush_size            = flush_size
+        self._flush_second          = flush_second
+        self._drain_size            = drain_size
+        self._backoff_second        = backoff_second
+        self._max_backoff_second    = max_backoff_second
+
+        self._condition     = threading.Condition()
+        self._is_running    = False
+        self._thread        = None
+
+        self.dropped_cnt    = 0
+        self.uploaded_cnt   = 0
+        self.error_cnt      = 0
+
+    @property
+    def queue_size(self):
+        return len(self._queue)
+
+    def start(self):
+        self._is_running = True
+        self._thread = threading.Thread(target=self._run, name='uploader', daemon=True)
+        self._thread.start()
+
+    # Stop the thread after a last flush
+    def close(self, timeout=None):
+        with self._condition:
+            self._is_running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # Never waits for the server
+    def put(self, result_list):
+        with self._condition:
+            dropped_cnt = self._queue.put(result_list)
+            if len(self._queue) >= self._flush_size:
+                self._condition.notify()
+        if dropped_cnt:
+            self.dropped_cnt += dropped_cnt
+            logging.warning(f'Upload queue is full. Dropped {dropped_cnt} oldest results')
+
+    def _getBatch(self):
+        with self._condition:
+            deadline = time.monotonic() + self._flush_second
+            while (self._is_running and len(self._queue) < self._flush_size):
+                wait_second = deadline - time.monotonic()
+                if wait_second <= 0:
+                    break
+                self._condition.wait(wait_second)
+            return self._queue.peek(max(self._flush_size, self._drain_size))
+
+    # Sleep, but wake up on close
+    def _backoff(self, retry_cnt):
+        backoff_second = min(self._max_backoff_second, self._backoff_second * 2**retry_cnt)
+        backoff_second = random.uniform(backoff_second/2, backoff_second)
+        logging.warning(f'Upload failed. Retry in {backoff_second:.1f} s')
+        with self._condition:
+            if self._is_running:
+                self._condition.wait(backoff_second)
+
+    def _run(self):
+        retry_cnt = 0
+        while (True):
+            batch = self._getBatch()
+            if not batch:
+                if not self._is_running:
+                    break
+                continue
+
+            if self._client.writeResults([result for _, result in batch]):
+                with self._condition:
+                    self._queue.remove(batch[-1][0])
+                self.uploaded_cnt += len(batch)
+                retry_cnt = 0
+            else:
+                self.error_cnt += 1
+                # Leave the rest in the queue on close, not to block exit forever
+                if not self._is_running:
+                    logging.error(f'Upload failed on close. {len(self._queue)} results left in queue')
+                    break
+                self._backoff(retry_cnt)
+                retry_cnt += 1
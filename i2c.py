@@ -16,20 +16,23 @@ __status__      = "Production"
 
 
 # ================================================
-import argparse, json, logging, sqlite3, os, time, smbus, sys
-from datetime import datetime
+import argparse, asyncio, atexit, json, logging, os, signal, time, sys
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
 
-# InfluxDB client
+# Helpers
+from helpers.capture import CaptureWriter
 from helpers.influxdbclient import InfluxDBClient
+from helpers.ringbuffer import DEFAULT_FILENAME as RING_FILENAME, RingWriter
+from helpers.spool import Spool
+from helpers.uploader import Uploader
 
 # Device
-from devices.aht10 import AHT10
-from devices.aht21 import AHT21
-from devices.ccs811 import CCS811
-from devices.mcp9809 import MCP9808
-import bme680 as BME680
+from helpers.collector import BusPoller, collectCycleAsync
+from helpers.scheduler import Scheduler
+from helpers.sensors import createSensor, HardwareBackend
+from devices.simbus import SimBackend
+from devices.tracing import TraceRecorder, TracingBackend
 from luma.core.interface.serial import i2c
 from luma.core.render import canvas
 from luma.oled.device import ssd1306 as SSD1306
@@ -40,7 +43,17 @@ from luma.oled.device import ssd1306 as SSD1306
 parser = argparse.ArgumentParser(description='Process some integers.')
 parser.add_argument('--INFLUXDB_TOKEN', help='InfluxDB token')
 parser.add_argument('--logging_filename', help='Logging output file name')
+parser.add_argument('--spool_filename', help='Spool file name of results waiting for upload')
+parser.add_argument('--simulate', action='store_true', help='Use simulated I2C buses instead of /dev/i2c-N')
+parser.add_argument('--trace', action='store_true', help='Log I2C transaction statistics of each device')
+parser.add_argument('--trace_filename', help='Dump every I2C transaction to this file, with --trace')
+parser.add_argument('--asyncio', action='store_true', help='Poll all devices on one asyncio event loop')
+parser.add_argument('--ring_filename', default=RING_FILENAME,
+        help='Ring buffer file of latest readings, read by the webserver')
+parser.add_argument('--capture', help='Append raw register bytes to this file, instead of converting and uploading')
 args = parser.parse_args()
+if args.capture and args.asyncio:
+    parser.error('--capture does not work with --asyncio')
 if args.INFLUXDB_TOKEN:
     os.environ['INFLUXDB_TOKEN'] = args.INFLUXDB_TOKEN
 
@@ -64,6 +77,7 @@ logging.basicConfig(
 # Important (static) variables
 INTERVAL_SECOND = 5.0
 TIMEOUT_SECOND = 60.0
+STATS_INTERVAL_SECOND = 600.0
 
 
 # -------------------------
@@ -75,166 +89,168 @@ config = json.load(json_file)
 # ================================================
 # Initialize
 # -------------------------
-# Influx DB
-idc = InfluxDBClient()
+# Influx DB, not used in capture mode
+if not args.capture:
+    idc = InfluxDBClient([config_device['name'] for config_device in config['devices']])
+
+    # Results land in the spool first, and are uploaded on background thread,
+    # so that InfluxDB never blocks sampling nor loses results
+    Path('spool').mkdir(parents=True, exist_ok=True)
+    spool_filename = args.spool_filename if args.spool_filename else 'spool/i2c.sqlite3'
+    uploader = Uploader(idc, queue=Spool(spool_filename))
+    uploader.start()
+
+    # Latest readings for the webserver and local tools, without database
+    ring = RingWriter(args.ring_filename)
 
 
 # -------------------------
 # I2C
-device_list = []
+backend = SimBackend.fromConfig(config) if args.simulate else HardwareBackend()
+recorder = None
+if args.trace:
+    recorder = TraceRecorder(args.trace_filename)
+    backend = TracingBackend(backend, recorder, config)
+    # Lines still buffered in the trace file are written on exit
+    atexit.register(recorder.close)
+    # Exit by SIGTERM, such as by kill or systemd, runs atexit functions too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+sensor_list = []
+ssd1306 = None
 for config_device in config['devices']:
-    # AHT10
-    if config_device['name'] == 'AHT10':
-        aht10 = AHT10(config_device['bus'])
-        aht10.initialize()
-
-    # AHT21
-    elif config_device['name'] == 'AHT21':
-        aht21 = AHT21(config_device['bus'])
-        #aht21.initialize()
-
-    # CCS811
-    elif config_device['name'] == 'CCS811':
-        ccs811 = CCS811(config_device['bus'])
-        ccs811.initialize()
-
-    # CCS811
-    elif config_device['name'] == 'MCP9808':
-        mcp9809 = MCP9808(config_device['bus'])
-        mcp9809.initialize()
-
-    # BME680
-    elif config_device['name'] == 'BME680':
-        bme680 = BME680.BME680(int(config_device['address'], 16), smbus.SMBus(config_device['bus']))
-        bme680.set_humidity_oversample(BME680.OS_2X)
-        bme680.set_pressure_oversample(BME680.OS_4X)
-        bme680.set_temperature_oversample(BME680.OS_8X)
-        bme680.set_filter(BME680.FILTER_SIZE_3)
-        bme680.set_gas_status(BME680.ENABLE_GAS_MEAS)
-        bme680.set_gas_heater_temperature(320)
-        bme680.set_gas_heater_duration(150)
-        bme680.select_gas_heater_profile(0)
-        bme680_burn_in_time = 300
-        bme680_gas_res_list = []
-        bme680_humidity_list = []
-        bme680_gas_res_baseline = 0
-        bme680_humidity_baseline = 0
-        bme680_humidity_weight = 0.25
-
-    # SSD1306
-    elif config_device['name'] == 'SSD1306':
+    # SSD1306, not simulated
+    if config_device['name'] == 'SSD1306':
+        if args.simulate:
+            continue
         serial = i2c(port=config_device['bus'], address=int(config_device['address'], 16))
         ssd1306 = SSD1306(serial)
+        ssd1306_interval = config_device.get('interval', INTERVAL_SECOND)
+        ssd1306_due = time.monotonic()
+
+    # Sensors
+    else:
+        sensor = createSensor(config_device, backend)
+        if sensor is not None:
+            sensor_list.append(sensor)
+
+
+# ================================================
+# Functions
+# -------------------------
+# SSD1306
+# Latest measures of each device, as devices are polled at their own interval
+latest_measures_dict = {}
+
+def drawDisplay(cycle):
+    global ssd1306_due
+    for result in cycle['results']:
+        latest_measures_dict[result['name']] = result['measures']
+
+    # Redraw at its own interval, not at every cycle
+    if ssd1306 is None or time.monotonic() < ssd1306_due:
+        return
+    ssd1306_due = time.monotonic() + ssd1306_interval
+
+    now_dt_str = cycle['time'].strftime('%Y-%m-%d %H:%M:%S')
+    # Later devices in config.json overwrite the measures of earlier ones
+    measures = {'humidity': -1, 'temperature': -1, 'pressure': -1, 'iaq': -1}
+    for config_device in config['devices']:
+        measures.update(latest_measures_dict.get(config_device['name'], {}))
+    with canvas(ssd1306) as draw:
+        draw.rectangle(ssd1306.bounding_box, outline="white", fill="black")
+        draw.text((10, 0), f'{now_dt_str}', fill="white")
+        draw.text((10, 20), f'{measures["temperature"]:.1f}°C, {measures["humidity"]:.1f}%', fill="white")
+        draw.text((10, 40), f'{measures["pressure"]:.0f}hPa, {measures["iaq"]:.0f}IAQ', fill="white")
+
+
+# -------------------------
+# Save to Influx DB
+# Queue measures to be uploaded in batches by the uploader,
+# and share them with the webserver at once by the ring buffer
+def saveResults(result_list):
+    uploader.put(result_list)
+    ring.write(result_list)
+
+
+# -------------------------
+# Log timing of the scheduler every STATS_INTERVAL_SECOND
+stats_due = time.monotonic() + STATS_INTERVAL_SECOND
+
+def logTimingStats():
+    global stats_due
+    if time.monotonic() < stats_due:
+        return
+    stats_due += STATS_INTERVAL_SECOND
+    stats = scheduler.getStats()
+    logging.info(
+            f"Timing: jitter mean {stats['jitter']['mean']*1000:.1f} ms, "
+            f"stdev {stats['jitter']['stdev']*1000:.1f} ms, max {stats['jitter']['max']*1000:.1f} ms, "
+            f"overrun {stats['overrun']['count']} cycles (max {stats['overrun']['max']*1000:.1f} ms), "
+            f"late {stats['late']}, skipped {stats['skipped']}"
+            )
+    scheduler.resetStats()
+
+    # I2C transactions
+    if recorder is not None:
+        for device, operation_dict in recorder.getHistograms().items():
+            for operation, stats in operation_dict.items():
+                logging.info(
+                        f"I2C {device} {operation}: {stats['count']} transactions, "
+                        f"{stats['bytes']} bytes, {stats['errors']} errors, mean {stats['mean_us']:.0f} us"
+                        )
+        recorder.reset()
+        recorder.flush()
+
+
+# -------------------------
+# asyncio collector
+# Sampling and display share one event loop
+async def loopAsync():
+    while (True):
+        due_sensor_list = scheduler.popDue()
+        if due_sensor_list:
+            cycle = await collectCycleAsync(due_sensor_list)
+            drawDisplay(cycle)
+            saveResults(cycle['results'])
+        logTimingStats()
+        await asyncio.sleep(scheduler.getSleepSecond())
 
 
 # ================================================
 # Loop
-start_time = time.time()
+# Each device is polled at its 'interval' in config.json, or INTERVAL_SECOND
+scheduler = Scheduler(sensor_list, INTERVAL_SECOND)
+
+if args.asyncio:
+    logging.info('Polling on asyncio event loop')
+    asyncio.run(loopAsync())
+
+# One worker per bus
+poller = BusPoller(sensor_list, is_raw=bool(args.capture))
+logging.info(f'Polling buses: {poller.bus_list}')
+
+# Raw register bytes are only written, and decoded later by helpers.capturereader
+capture_writer = None
+if args.capture:
+    Path(args.capture).parent.mkdir(parents=True, exist_ok=True)
+    capture_writer = CaptureWriter(args.capture, sensor_list)
+    logging.info(f'Capturing raw register bytes to {args.capture}')
+
 error_cnt = 0
 while (True):
-    now_dt_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # Trigger due sensors, then collect them, on every bus in parallel
+    due_sensor_list = scheduler.popDue()
+    if due_sensor_list:
+        cycle = poller.collect(due_sensor_list)
 
-    result_list = []
-    for config_device in config['devices']:
-        # AHT10
-        if config_device['name'] == 'AHT10':
-            humidity, temperature = aht10.getHumidityTemperature()
-            temp_dict = {
-                    'name': config_device['name'],
-                    'measures': {'humidity': humidity, 'temperature': temperature}
-                    }
-            result_list.append(temp_dict)
-            logging.info(f'AHT10: Humid: {humidity:.0f}±2%, Tempe: {temperature:.1f}±0.3°C')
-
-        # AHT21
-        if config_device['name'] == 'AHT21':
-            humidity, temperature = aht21.getHumidityTemperature()
-            temp_dict = {
-                    'name': config_device['name'],
-                    'measures': {'humidity': humidity, 'temperature': temperature}
-                    }
-            result_list.append(temp_dict)
-            logging.info(f'AHT21: humidity: {humidity:.0f}±2%, Tempe: {temperature:.1f}±0.3°C')
-
-        # CCS811
-        if config_device['name'] == 'CCS811':
-            eCO2, eTVOC = ccs811.getECO2ETVOC() # Not use eCO2 value
-            temp_dict = {
-                    'name': config_device['name'],
-                    'measures': {'eTVOC': eTVOC}
-                    }
-            result_list.append(temp_dict)
-            logging.info(f'CCS811: eTVOC: {eTVOC} ppb')
-
-        # MCP9808
-        if config_device['name'] == 'MCP9808':
-            temperature = mcp9809.getTemperature() #
-            temp_dict = {
-                    'name': config_device['name'],
-                    'measures': {'temperature': temperature}
-                    }
-            result_list.append(temp_dict)
-            logging.info(f'MCP9808: temperature: {temperature:.1f}±0.25°C')
-
-        # BME680
-        if config_device['name'] == 'BME680':
-            humidity = temperature = pressure = iaq = -1
-            if bme680.get_sensor_data():
-                temperature = bme680.data.temperature
-                pressure = bme680.data.pressure
-                humidity = bme680.data.humidity
-                if bme680.data.heat_stable:
-                    gas_resistance = bme680.data.gas_resistance
-                    curr_time = time.time()
-                    if curr_time - start_time < bme680_burn_in_time:
-                        bme680_humidity_list.append(humidity)
-                        bme680_gas_res_list.append(gas_resistance)
-                    else:
-                        if bme680_gas_res_baseline == 0:
-                            bme680_gas_res_baseline = sum(bme680_gas_res_list)/len(bme680_gas_res_list)
-                        if bme680_humidity_baseline == 0:
-                            bme680_humidity_baseline = sum(bme680_humidity_list)/len(bme680_humidity_list)
-                        humidity_score = humidity/bme680_humidity_baseline * bme680_humidity_weight * 100
-                        gas_res_score = gas_resistance/bme680_gas_res_baseline * (1-bme680_humidity_weight) * 100
-                        iaq = humidity_score + gas_res_score
-            temp_dict = {
-                    'name': config_device['name'],
-                    'measures': {
-                        'humidity': humidity, 'temperature': temperature,
-                        'pressure': pressure, 'iaq': iaq
-                        }
-                    }
-            result_list.append(temp_dict)
-            logging.info(f"""BME680:
-                    Humid: {humidity:.0f}±3%, Tempe: {temperature:.1f}±1°C,
-                    Press: {pressure}hPa, IAQ: {iaq}"""
-                    )
-
-        # SSD1306
-        if config_device['name'] == 'SSD1306':
-            with canvas(ssd1306) as draw:
-                draw.rectangle(ssd1306.bounding_box, outline="white", fill="black")
-                draw.text((10, 0), f'{now_dt_str}', fill="white")
-                draw.text((10, 20), f'{temperature:.1f}°C, {humidity:.1f}%', fill="white")
-                draw.text((10, 40), f'{pressure:.0f}hPa, {iaq:.0f}IAQ', fill="white")
-
-
-    # --------------------------
-    # Save to Influx DB
-    for result in result_list:
-
-        for k, v in result['measures'].items():
-            if v != -1:
-                idc.write(result['name'], k, v)
-                #print(result['name'], k, v)
-
-
-    # Write environment data to CCS811
-    #if result['name'] == 'CCS811':
-    #    ccs811.writeEnvironmentData(humidity, temperature)
-
-
-    # --------------------------
-    # Wait till next interval second
-    sleep_time = INTERVAL_SECOND * 10**6 - datetime.utcnow().microsecond # in micro second
-    time.sleep(sleep_time/10**6) # in second
+        if capture_writer is not None:
+            capture_writer.write(cycle['results'])
+        else:
+            drawDisplay(cycle)
+
+            saveResults(cycle['results'])
+
+    logTimingStats()
+
+    # Wait till next due sensor
+    time.sleep(scheduler.getSleepSecond())
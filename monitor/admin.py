@@ -1,5 +1,8 @@
 from django.contrib import admin
 
-from .models import Data
+from .models import Data, DataDay, DataHour, DataMinute
 
 admin.site.register(Data)
+admin.site.register(DataMinute)
+admin.site.register(DataHour)
+admin.site.register(DataDay)
@@ -0,0 +1,70 @@
+"""
+Downsampling of a series to a target point count, with NumPy.
+Each method returns the sorted indexes of the points to keep,
+so that the time of the points is kept as it is.
+"""
+
+import numpy as np
+
+
+def lttb(x, y, points):
+    """
+    Largest-Triangle-Three-Buckets: the first and last points, and in each of points-2 buckets between them,
+    the point of the largest triangle with the previous kept point and the mean of the next bucket
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Buckets of the n-2 points between the first and the last, bucket i is edges[i]:edges[i+1]
+    edges = np.arange(points - 1) * (n - 2) // (points - 2) + 1
+    # Mean of every bucket by cumulative sums, then the last point as the bucket after the last one
+    cumsum_x = np.concatenate(([0.], np.cumsum(x)))
+    cumsum_y = np.concatenate(([0.], np.cumsum(y)))
+    count = np.diff(edges)
+    mean_x = np.append((cumsum_x[edges[1:]] - cumsum_x[edges[:-1]]) / count, x[-1])
+    mean_y = np.append((cumsum_y[edges[1:]] - cumsum_y[edges[:-1]]) / count, y[-1])
+
+    index = np.empty(points, dtype=np.int64)
+    index[0] = 0
+    index[-1] = n - 1
+    # Each bucket depends on the point kept in the previous one, so only buckets are looped
+    a = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Twice the triangle areas of all points of the bucket
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[start:end] - y[a])
+                - (x[a] - x[start:end]) * (mean_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        index[i + 1] = a
+    return index
+
+
+def minMax(x, y, points):
+    """
+    Minimum and maximum points of points/2 buckets of the same count,
+    which keeps every peak. x is not used, as buckets are of the same count
+    """
+    n = len(y)
+    if points >= n or points < 2:
+        return np.arange(n)
+    y = np.asarray(y)
+    bucket_cnt = points // 2
+    start = -(-np.arange(bucket_cnt) * n // bucket_cnt)
+    end = np.append(start[1:], n)
+    count = end - start
+    # First minimum and last maximum of each bucket, every bucket has one
+    min_index = np.flatnonzero(y == np.repeat(np.minimum.reduceat(y, start), count))
+    max_index = np.flatnonzero(y == np.repeat(np.maximum.reduceat(y, start), count))
+    return np.unique(np.concatenate((
+        min_index[np.searchsorted(min_index, start)],
+        max_index[np.searchsorted(max_index, end) - 1],
+        )))
+
+
+METHOD_DICT = {
+        'lttb': lttb,
+        'minmax': minMax,
+        }
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from datetime import timedelta
+from monitor.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the rollup tables from Data, of all rows or of the last days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Rebuild only the buckets of the last days')
+
+    def handle(self, *args, **options):
+        start = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        count_dict = backfill(start)
+        for model, count in count_dict.items():
+            self.stdout.write(f'{model.__name__}: {count} buckets')
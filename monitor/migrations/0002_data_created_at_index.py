@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='data',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, help_text='Created Datetime'),
+        ),
+    ]
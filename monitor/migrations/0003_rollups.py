@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0002_data_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Bucket start Datetime', unique=True)),
+                ('count', models.IntegerField(help_text='Count of rows')),
+                ('humidity_min', models.FloatField(help_text='Minimum humidity')),
+                ('humidity_max', models.FloatField(help_text='Maximum humidity')),
+                ('humidity_mean', models.FloatField(help_text='Mean humidity')),
+                ('temperature_min', models.FloatField(help_text='Minimum temperature')),
+                ('temperature_max', models.FloatField(help_text='Maximum temperature')),
+                ('temperature_mean', models.FloatField(help_text='Mean temperature')),
+                ('eCO2_min', models.IntegerField(help_text='Minimum eCO2')),
+                ('eCO2_max', models.IntegerField(help_text='Maximum eCO2')),
+                ('eCO2_mean', models.FloatField(help_text='Mean eCO2')),
+                ('TVOC_min', models.IntegerField(help_text='Minimum TVOC')),
+                ('TVOC_max', models.IntegerField(help_text='Maximum TVOC')),
+                ('TVOC_mean', models.FloatField(help_text='Mean TVOC')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DataHour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Bucket start Datetime', unique=True)),
+                ('count', models.IntegerField(help_text='Count of rows')),
+                ('humidity_min', models.FloatField(help_text='Minimum humidity')),
+                ('humidity_max', models.FloatField(help_text='Maximum humidity')),
+                ('humidity_mean', models.FloatField(help_text='Mean humidity')),
+                ('temperature_min', models.FloatField(help_text='Minimum temperature')),
+                ('temperature_max', models.FloatField(help_text='Maximum temperature')),
+                ('temperature_mean', models.FloatField(help_text='Mean temperature')),
+                ('eCO2_min', models.IntegerField(help_text='Minimum eCO2')),
+                ('eCO2_max', models.IntegerField(help_text='Maximum eCO2')),
+                ('eCO2_mean', models.FloatField(help_text='Mean eCO2')),
+                ('TVOC_min', models.IntegerField(help_text='Minimum TVOC')),
+                ('TVOC_max', models.IntegerField(help_text='Maximum TVOC')),
+                ('TVOC_mean', models.FloatField(help_text='Mean TVOC')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DataMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Bucket start Datetime', unique=True)),
+                ('count', models.IntegerField(help_text='Count of rows')),
+                ('humidity_min', models.FloatField(help_text='Minimum humidity')),
+                ('humidity_max', models.FloatField(help_text='Maximum humidity')),
+                ('humidity_mean', models.FloatField(help_text='Mean humidity')),
+                ('temperature_min', models.FloatField(help_text='Minimum temperature')),
+                ('temperature_max', models.FloatField(help_text='Maximum temperature')),
+                ('temperature_mean', models.FloatField(help_text='Mean temperature')),
+                ('eCO2_min', models.IntegerField(help_text='Minimum eCO2')),
+                ('eCO2_max', models.IntegerField(help_text='Maximum eCO2')),
+                ('eCO2_mean', models.FloatField(help_text='Mean eCO2')),
+                ('TVOC_min', models.IntegerField(help_text='Minimum TVOC')),
+                ('TVOC_max', models.IntegerField(help_text='Maximum TVOC')),
+                ('TVOC_mean', models.FloatField(help_text='Mean TVOC')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -1,12 +1,14 @@
 from django.db import models
 
+from datetime import timedelta
+
 class Data(models.Model):
     """
     Data with huminity, temperature, eCO2, TVOC
     """
 
     # Fields
-    created_at = models.DateTimeField(help_text='Created Datetime')
+    created_at = models.DateTimeField(help_text='Created Datetime', db_index=True)
     humidity = models.FloatField(help_text='Humidity')
     temperature = models.FloatField(help_text='Temperature')
     eCO2 = models.IntegerField(help_text='eCO2')
@@ -24,3 +26,50 @@ class Data(models.Model):
     #def __str__(self):
     #    """String for representing the MyModelName object (in Admin site etc.)."""
     #    return self.my_field_name
+
+
+class Rollup(models.Model):
+    """
+    Min, max, mean and count of Data rows in a bucket of the resolution, from bucket
+    """
+
+    # Fields
+    bucket = models.DateTimeField(help_text='Bucket start Datetime', unique=True)
+    count = models.IntegerField(help_text='Count of rows')
+    humidity_min = models.FloatField(help_text='Minimum humidity')
+    humidity_max = models.FloatField(help_text='Maximum humidity')
+    humidity_mean = models.FloatField(help_text='Mean humidity')
+    temperature_min = models.FloatField(help_text='Minimum temperature')
+    temperature_max = models.FloatField(help_text='Maximum temperature')
+    temperature_mean = models.FloatField(help_text='Mean temperature')
+    eCO2_min = models.IntegerField(help_text='Minimum eCO2')
+    eCO2_max = models.IntegerField(help_text='Maximum eCO2')
+    eCO2_mean = models.FloatField(help_text='Mean eCO2')
+    TVOC_min = models.IntegerField(help_text='Minimum TVOC')
+    TVOC_max = models.IntegerField(help_text='Maximum TVOC')
+    TVOC_mean = models.FloatField(help_text='Mean TVOC')
+
+    ## Metadata
+    class Meta:
+        abstract = True
+
+
+class DataMinute(Rollup):
+    """
+    Data of each minute
+    """
+    resolution = timedelta(minutes=1)
+
+
+class DataHour(Rollup):
+    """
+    Data of each hour
+    """
+    resolution = timedelta(hours=1)
+
+
+class DataDay(Rollup):
+    """
+    Data of each day, in TIME_ZONE
+    """
+    resolution = timedelta(days=1)
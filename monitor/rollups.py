@@ -0,0 +1,105 @@
+"""
+Rollup tables of Data: DataMinute, DataHour and DataDay.
+Rows saved one by one are merged into them at once by a signal.
+Rows saved otherwise, like by bulk_create, and changed or deleted rows are rolled up by
+    python3 manage.py backfill_rollups
+"""
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Data, DataDay, DataHour, DataMinute
+from .series import SERIES_COLUMN_LIST
+
+# Coarsest first
+ROLLUP_MODEL_LIST = [DataDay, DataHour, DataMinute]
+_TRUNC_DICT = {DataMinute: TruncMinute, DataHour: TruncHour, DataDay: TruncDay}
+_BUCKET_REPLACE_DICT = {
+        DataMinute: {'second': 0, 'microsecond': 0},
+        DataHour: {'minute': 0, 'second': 0, 'microsecond': 0},
+        DataDay: {'hour': 0, 'minute': 0, 'second': 0, 'microsecond': 0},
+        }
+
+
+# Start of the bucket of created_at in model, in TIME_ZONE
+def getBucket(model, created_at):
+    return timezone.localtime(created_at).replace(**_BUCKET_REPLACE_DICT[model])
+
+
+# Coarsest rollup model of resolution or finer, or None when Data is needed
+def getRollupModel(resolution):
+    for model in ROLLUP_MODEL_LIST:
+        if model.resolution <= resolution:
+            return model
+    return None
+
+
+# Merge new Data rows into every rollup table
+def addRows(row_list):
+    with transaction.atomic():
+        for model in ROLLUP_MODEL_LIST:
+            bucket_row_dict = {}
+            for row in row_list:
+                bucket_row_dict.setdefault(getBucket(model, row.created_at), []).append(row)
+
+            for bucket, bucket_row_list in bucket_row_dict.items():
+                rollup = model.objects.filter(bucket=bucket).first() or model(bucket=bucket, count=0)
+                count = len(bucket_row_list)
+                for column in SERIES_COLUMN_LIST:
+                    value_list = [getattr(row, column) for row in bucket_row_list]
+                    if rollup.count == 0:
+                        value_min, value_max, mean = min(value_list), max(value_list), 0
+                    else:
+                        value_min = min(getattr(rollup, f'{column}_min'), *value_list)
+                        value_max = max(getattr(rollup, f'{column}_max'), *value_list)
+                        mean = getattr(rollup, f'{column}_mean')
+                    setattr(rollup, f'{column}_min', value_min)
+                    setattr(rollup, f'{column}_max', value_max)
+                    setattr(rollup, f'{column}_mean', (mean * rollup.count + sum(value_list)) / (rollup.count + count))
+                rollup.count += count
+                rollup.save()
+
+
+@receiver(post_save, sender=Data)
+def rollUpSavedRow(sender, instance, created, **kwargs):
+    if created:
+        addRows([instance])
+
+
+# Rebuild buckets of every rollup table from the Data rows from start to end, all when None,
+# by one aggregate query of each table. Buckets of start and end are rebuilt whole.
+# Return {model: count of buckets}
+def backfill(start=None, end=None):
+    aggregate_dict = {'count': Count('id')}
+    for column in SERIES_COLUMN_LIST:
+        aggregate_dict[f'{column}_min'] = Min(column)
+        aggregate_dict[f'{column}_max'] = Max(column)
+        aggregate_dict[f'{column}_mean'] = Avg(column)
+
+    count_dict = {}
+    with transaction.atomic():
+        for model in ROLLUP_MODEL_LIST:
+            data_queryset = Data.objects.all()
+            rollup_queryset = model.objects.all()
+            if start is not None:
+                bucket_start = getBucket(model, start)
+                data_queryset = data_queryset.filter(created_at__gte=bucket_start)
+                rollup_queryset = rollup_queryset.filter(bucket__gte=bucket_start)
+            if end is not None:
+                bucket_end = getBucket(model, end) + model.resolution
+                data_queryset = data_queryset.filter(created_at__lt=bucket_end)
+                rollup_queryset = rollup_queryset.filter(bucket__lt=bucket_end)
+
+            row_list = (data_queryset
+                    .annotate(bucket=_TRUNC_DICT[model]('created_at', tzinfo=timezone.get_default_timezone()))
+                    .values('bucket')
+                    .annotate(**aggregate_dict)
+                    .order_by('bucket'))
+            rollup_queryset.delete()
+            rollup_list = model.objects.bulk_create([model(**row) for row in row_list], batch_size=500)
+            count_dict[model] = len(rollup_list)
+    return count_dict
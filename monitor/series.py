@@ -0,0 +1,70 @@
+"""
+Columnar access to Data for the dashboard.
+Every series of a time range is fetched by one range query on the created_at index,
+and rows are transposed into columns in one pass.
+"""
+
+import numpy as np
+
+from .downsample import METHOD_DICT
+from .models import Data
+
+# Columns drawn on the dashboard
+SERIES_COLUMN_LIST = ['temperature', 'humidity', 'eCO2', 'TVOC']
+
+
+def getSeries(start, end=None, column_list=SERIES_COLUMN_LIST, is_start_included=True):
+    """
+    Series of rows from start (included unless is_start_included is False) to end (excluded), oldest first,
+    as {'created_at': [datetime], column: [value]}
+    """
+    if is_start_included:
+        queryset = Data.objects.filter(created_at__gte=start)
+    else:
+        queryset = Data.objects.filter(created_at__gt=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=end)
+    row_list = queryset.order_by('created_at').values_list('created_at', *column_list)
+
+    return _transpose(row_list, column_list)
+
+
+def getRollupSeries(model, start, column_list=SERIES_COLUMN_LIST):
+    """
+    Series of the means of buckets of rollup model from start, oldest first, as getSeries
+    """
+    row_list = (model.objects.filter(bucket__gte=start).order_by('bucket')
+            .values_list('bucket', *[f'{column}_mean' for column in column_list]))
+    return _transpose(row_list, column_list)
+
+
+# Columns of rows of created_at and column list, as {'created_at': [datetime], column: [value]}
+def _transpose(row_list, column_list):
+    # zip transposes rows into columns
+    column_tuple = tuple(zip(*row_list)) or ((),) * (1 + len(column_list))
+    series = {'created_at': list(column_tuple[0])}
+    for column, value_tuple in zip(column_list, column_tuple[1:]):
+        series[column] = list(value_tuple)
+    return series
+
+
+def getTraces(series, points=None, method='lttb'):
+    """
+    Plotly traces of each column of series, as {column: {'x': [str], 'y': [value]}},
+    downsampled to at most points each by method of METHOD_DICT. All points when points is None
+    """
+    created_at_list = series['created_at']
+    x = np.array([created_at.timestamp() for created_at in created_at_list])
+    trace_dict = {}
+    for column, value_list in series.items():
+        if column == 'created_at':
+            continue
+        if points is None:
+            index = np.arange(len(x))
+        else:
+            index = METHOD_DICT[method](x, value_list, points)
+        trace_dict[column] = {
+                'x': [str(created_at_list[i]) for i in index.tolist()],
+                'y': np.asarray(value_list)[index].tolist(),
+                }
+    return trace_dict
@@ -0,0 +1,135 @@
+"""
+Live push of readings to dashboards by Server-Sent Events, served by the ASGI application (webserver/asgi.py).
+
+One Broadcaster per process is the only subscription to new data, whatever the number of dashboards:
+every second it reads the ring buffer of the collector and new Data rows once,
+and puts them to the queue of each connected client.
+
+Events:
+- readings: {'readings': [{'device', 'field', 'time': str, 'value'}]}, from the ring buffer
+- series: {'since': str, 'cursor': str, 'traces': ...}, new Data rows as the series view,
+  where since is the cursor of the previous series event
+"""
+
+import asyncio, json
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+
+from helpers.ringbuffer import DEFAULT_FILENAME as RING_FILENAME, RingReader
+from .series import getSeries, getTraces
+
+STREAM_PATH = '/monitor/stream/'
+POLL_SECOND = 1.0
+KEEPALIVE_SECOND = 15.0
+# Events kept for a client too slow to read them, later ones are dropped
+QUEUE_SIZE = 100
+
+
+# =================================================
+class Broadcaster:
+    """
+    Shared subscription to the ring buffer and Data, fanned out to a queue per client.
+    It runs on the event loop of the server only while a client is connected.
+    """
+    def __init__(self, ring_filename=RING_FILENAME, poll_second=POLL_SECOND):
+        self._ring_filename = ring_filename
+        self._poll_second = poll_second
+        self._queue_set = set()
+        self._task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self._queue_set.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._queue_set.discard(queue)
+
+    def _publish(self, event, data):
+        for queue in self._queue_set:
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                pass
+
+    async def _run(self):
+        ring_reader = None
+        since_seq = 0
+        cursor = datetime.now(timezone.utc)
+        while self._queue_set:
+            # Readings after the last poll, from the start of the subscription
+            try:
+                if ring_reader is None:
+                    ring_reader = RingReader(self._ring_filename)
+                    since_seq = ring_reader.seq
+                reading_list, since_seq = ring_reader.readSince(since_seq)
+            except (OSError, ValueError):
+                ring_reader = None
+                reading_list = []
+            if reading_list:
+                self._publish('readings', {'readings': [{
+                    'device': device,
+                    'field': field,
+                    'time': str(datetime.fromtimestamp(time_ns / 1e9, timezone.utc)),
+                    'value': value,
+                    } for seq, time_ns, device, field, value in reading_list]})
+
+            # New rows, by one query for all clients
+            series = await sync_to_async(getSeries)(cursor, is_start_included=False)
+            if series['created_at']:
+                since = cursor
+                cursor = series['created_at'][-1]
+                self._publish('series', {'since': str(since), 'cursor': str(cursor), 'traces': getTraces(series)})
+
+            await asyncio.sleep(self._poll_second)
+
+
+broadcaster = Broadcaster()
+
+
+# =================================================
+class StreamApplication:
+    """
+    ASGI application serving the event stream at path, and every other request by application
+    """
+    def __init__(self, application, path=STREAM_PATH):
+        self._application = application
+        self._path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self._path:
+            return await self._application(scope, receive, send)
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')],
+            })
+        queue = broadcaster.subscribe()
+        disconnect_task = asyncio.ensure_future(self._waitDisconnect(receive))
+        try:
+            while True:
+                get_task = asyncio.ensure_future(queue.get())
+                done_set, _ = await asyncio.wait({get_task, disconnect_task},
+                        timeout=KEEPALIVE_SECOND, return_when=asyncio.FIRST_COMPLETED)
+                if disconnect_task in done_set:
+                    get_task.cancel()
+                    break
+                if get_task in done_set:
+                    event, data = get_task.result()
+                    body = f'event: {event}\ndata: {json.dumps(data)}\n\n'
+                else:
+                    # Comment line, so that proxies keep the connection
+                    get_task.cancel()
+                    body = ': keepalive\n\n'
+                await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+        finally:
+            broadcaster.unsubscribe(queue)
+            disconnect_task.cancel()
+
+    async def _waitDisconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
@@ -1,3 +1,85 @@
 from django.test import TestCase
 
-# Create your tests here.
+from datetime import datetime, timedelta, timezone
+
+from .models import Data, DataDay, DataHour, DataMinute
+from .rollups import ROLLUP_MODEL_LIST, addRows, backfill, getRollupModel
+
+# Fields of rollup rows to compare
+ROLLUP_FIELD_LIST = ['bucket', 'count'] + [
+        f'{column}_{stat}' for column in ['humidity', 'temperature', 'eCO2', 'TVOC']
+        for stat in ['min', 'max', 'mean']]
+
+
+class RollupTests(TestCase):
+    """
+    Rollups merged row by row equal the ones rebuilt by backfill
+    """
+    # 300 rows every 7 minutes 13 seconds, over midnight in Asia/Tokyo
+    def _getRowList(self):
+        start = datetime(2024, 3, 1, 13, 5, 30, tzinfo=timezone.utc)
+        return [Data(
+            created_at=start + i * timedelta(minutes=7, seconds=13),
+            humidity=40 + (i * 7) % 23 + .5,
+            temperature=15 + (i * 11) % 17 * .25,
+            eCO2=400 + (i * 37) % 600,
+            TVOC=(i * 13) % 250,
+            ) for i in range(300)]
+
+    def _getRollups(self, model):
+        return list(model.objects.order_by('bucket').values_list(*ROLLUP_FIELD_LIST))
+
+    def _assertRollupsEqual(self, rollup_dict):
+        for model in ROLLUP_MODEL_LIST:
+            rollup_list = self._getRollups(model)
+            self.assertEqual(len(rollup_list), len(rollup_dict[model]))
+            for rollup, expected in zip(rollup_list, rollup_dict[model]):
+                self.assertEqual(rollup[:2], expected[:2])
+                for value, expected_value in zip(rollup[2:], expected[2:]):
+                    self.assertAlmostEqual(value, expected_value)
+
+    def test_saved_rows_equal_backfill(self):
+        # Each save is rolled up by the signal
+        for row in self._getRowList():
+            row.save()
+        rollup_dict = {model: self._getRollups(model) for model in ROLLUP_MODEL_LIST}
+        self.assertEqual(sum(rollup[1] for rollup in rollup_dict[DataDay]), 300)
+        # Days of Asia/Tokyo
+        self.assertEqual(len(rollup_dict[DataDay]), 3)
+        self.assertEqual(len(rollup_dict[DataMinute]), 300)
+
+        count_dict = backfill()
+        self.assertEqual(count_dict[DataHour], len(rollup_dict[DataHour]))
+        self._assertRollupsEqual(rollup_dict)
+
+    def test_added_rows_equal_backfill(self):
+        # Rows of bulk_create are not rolled up by the signal, but by backfill or addRows
+        row_list = Data.objects.bulk_create(self._getRowList())
+        self.assertEqual(DataHour.objects.count(), 0)
+        backfill()
+        rollup_dict = {model: self._getRollups(model) for model in ROLLUP_MODEL_LIST}
+
+        for model in ROLLUP_MODEL_LIST:
+            model.objects.all().delete()
+        # In several calls, so that buckets are merged with existing ones
+        for i in range(0, 300, 40):
+            addRows(row_list[i:i + 40])
+        self._assertRollupsEqual(rollup_dict)
+
+    def test_backfill_rebuilds_range(self):
+        row_list = Data.objects.bulk_create(self._getRowList())
+        backfill()
+        rollup_dict = {model: self._getRollups(model) for model in ROLLUP_MODEL_LIST}
+
+        # Buckets from start to end are rebuilt whole, others are kept
+        DataHour.objects.filter(bucket__gte=row_list[100].created_at).update(count=0)
+        backfill(row_list[100].created_at, row_list[-1].created_at)
+        self._assertRollupsEqual(rollup_dict)
+
+    def test_getRollupModel(self):
+        self.assertIsNone(getRollupModel(timedelta(seconds=30)))
+        self.assertIs(getRollupModel(timedelta(minutes=1)), DataMinute)
+        self.assertIs(getRollupModel(timedelta(minutes=59)), DataMinute)
+        self.assertIs(getRollupModel(timedelta(hours=1)), DataHour)
+        self.assertIs(getRollupModel(timedelta(hours=23)), DataHour)
+        self.assertIs(getRollupModel(timedelta(days=7)), DataDay)
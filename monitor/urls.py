@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('series/', views.series, name='series'),
+    path('latest/', views.latest, name='latest'),
 ]
@@ -1,25 +1,97 @@
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils.dateparse import parse_datetime
 
-from .models import Data
+from .downsample import METHOD_DICT
+from .rollups import getRollupModel
+from .series import getRollupSeries, getSeries, getTraces
+from .stream import STREAM_PATH
 from datetime import datetime, timedelta, timezone
+import json
+from helpers.ringbuffer import RingReader
 JST = timezone(timedelta(hours=+9), 'JST')
 
+# Ring buffer written by i2c.py, opened once per process
+ring_reader = None
 
+# Points of each graph, so that the page stays small for any range
+DEFAULT_POINTS = 1000
+MAX_POINTS = 5000
+
+
+# Integer of GET parameter name in [minimum, maximum], or default when it is not given or not an integer
+def _getIntParam(request, name, default, minimum, maximum):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        return default
+    return min(max(value, minimum), maximum)
+
+
+# ?points= points of each graph and ?downsample= lttb or minmax
+def _getDownsampleParams(request):
+    points = _getIntParam(request, 'points', DEFAULT_POINTS, 3, MAX_POINTS)
+    method = request.GET.get('downsample', 'lttb')
+    if method not in METHOD_DICT:
+        method = 'lttb'
+    return points, method
+
+
+# Cursor of the next series request: created_at of the last row, or start when there is no row
+def _getCursor(series, start):
+    return str(series['created_at'][-1] if series['created_at'] else start)
+
+
+# ?hours= range till now, and downsample parameters
 def index(request):
-    data = Data.objects.filter(
-            created_at__gte=datetime.now(JST)-timedelta(hours=1) # Get 12 hours before data
-            ).order_by('-created_at')
-    created_at_list = list( data.values_list('created_at', flat=True) )
-    created_at_list = [ str(created_at) for created_at in created_at_list]
-    temperature_list = list( data.values_list('temperature', flat=True) )
-    humidity_list = list( data.values_list('humidity', flat=True) )
-    eCO2_list = list( data.values_list('eCO2', flat=True) )
-    TVOC_list = list( data.values_list('TVOC', flat=True) )
+    hours = _getIntParam(request, 'hours', 1, 1, 24*366)
+    points, method = _getDownsampleParams(request)
+
+    # All series of the range in one query, of the coarsest rollup table with a point at least every hours/points
+    start = datetime.now(JST)-timedelta(hours=hours)
+    rollup_model = getRollupModel(timedelta(hours=hours) / points)
+    if rollup_model is None:
+        series = getSeries(start)
+    else:
+        series = getRollupSeries(rollup_model, start)
     context = {
-            'created_at_list': created_at_list,
-            'temperature_list': temperature_list,
-            'humidity_list': humidity_list,
-            'eCO2_list': eCO2_list,
-            'TVOC_list': TVOC_list,
+            'traces_json': json.dumps(getTraces(series, points, method)),
+            'cursor': _getCursor(series, start),
+            'points': points,
+            # New rows are only appended to graphs of rows, not of bucket means
+            'is_live': rollup_model is None,
+            'stream_path': STREAM_PATH,
             }
     return render(request, 'index.html', context)
+
+
+# Rows after ?since= cursor, a datetime as given by the previous response or index,
+# downsampled as index when there are more than points
+# {'cursor': str, 'traces': {column: {'x': [str], 'y': [value]}}}
+def series(request):
+    since = parse_datetime(request.GET.get('since', ''))
+    if since is None:
+        return JsonResponse({'error': 'since must be a datetime'}, status=400)
+    points, method = _getDownsampleParams(request)
+
+    new_series = getSeries(since, is_start_included=False)
+    return JsonResponse({
+        'cursor': _getCursor(new_series, since),
+        'traces': getTraces(new_series, points, method),
+        })
+
+
+# Latest readings of the collector, from the ring buffer without database
+# {device: {field: {'time': ns, 'value': value}}}
+def latest(request):
+    global ring_reader
+    try:
+        if ring_reader is None:
+            ring_reader = RingReader()
+        latest_dict = ring_reader.getLatest()
+    except (OSError, ValueError) as e:
+        return JsonResponse({'error': f'No readings of the collector. {e}'}, status=503)
+    return JsonResponse({
+        device: {field: {'time': time_ns, 'value': value} for field, (time_ns, value) in field_dict.items()}
+        for device, field_dict in latest_dict.items()
+        })
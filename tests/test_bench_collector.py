@@ -0,0 +1,20 @@
+"""
+Smoke test of the collector benchmark, with faults
+"""
+
+import random
+
+import pytest
+
+from benchmarks.bench_collector import runBenchmark
+from tests.test_simbus import CONFIG
+
+
+@pytest.mark.parametrize('mode', ['bus', 'asyncio', 'sequential'])
+def test_runBenchmark_with_faults(mode):
+    random.seed(0)
+    metrics = runBenchmark(CONFIG, mode, cycles=5, clock_hz=None, fault_rate=0.3)
+    assert metrics['readings'] == 5 * len(CONFIG['devices'])
+    assert metrics['bus_errors'] > 0
+    assert set(metrics['failed_readings']) == {'AHT21', 'BME680', 'MCP9808', 'CCS811'}
+    assert sum(metrics['failed_readings'].values()) > 0
@@ -0,0 +1,119 @@
+"""
+devices.bme680_batch gives exactly the values of the scalar driver, BME680._calc_*
+"""
+
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from devices import bme680_batch, constants
+from devices.bme680_example import BME680
+
+
+SAMPLE_CNT = 30
+CALIBRATION_CNT = 300
+
+
+# Calibration of random register values, in the ranges of the datasheet
+def _randomCalibration(rng):
+    u16 = lambda: rng.randint(0, 65535)
+    s16 = lambda: rng.randint(-32768, 32767)
+    u8 = lambda: rng.randint(0, 255)
+    s8 = lambda: rng.randint(-128, 127)
+    return SimpleNamespace(
+            par_t1=u16(), par_t2=s16(), par_t3=s8(),
+            par_p1=u16(), par_p2=s16(), par_p3=s8(), par_p4=s16(), par_p5=s16(),
+            par_p6=s8(), par_p7=s8(), par_p8=s16(), par_p9=s16(), par_p10=u8(),
+            par_h1=rng.randint(0, 4095), par_h2=rng.randint(0, 4095),
+            par_h3=s8(), par_h4=s8(), par_h5=s8(), par_h6=u8(), par_h7=s8(),
+            range_sw_err=rng.randint(-8, 7), t_fine=0)
+
+
+# Driver without a device, computing with calibration
+def _scalarDriver(calibration, variant):
+    bme680 = BME680.__new__(BME680)
+    bme680.calibration_data = calibration
+    bme680.offset_temp_in_t_fine = 0
+    bme680._variant = variant
+    bme680.data = constants.FieldData()
+    return bme680
+
+
+# Scalar values of random raw field data blocks, or None when the driver divides by zero
+def _scalarValues(bme680, regs_list):
+    value_list = []
+    try:
+        for regs in regs_list:
+            bme680._set_field_data(regs)
+            value_list.append((bme680.data.temperature, bme680.data.pressure,
+                bme680.data.humidity, bme680.data.gas_resistance))
+    except ZeroDivisionError:
+        return None
+    return value_list
+
+
+@pytest.mark.parametrize('variant', [constants.VARIANT_LOW, constants.VARIANT_HIGH])
+def test_compensateFieldData_matches_driver(variant):
+    rng = random.Random(variant)
+    for _ in range(CALIBRATION_CNT):
+        calibration = _randomCalibration(rng)
+        regs_list = [[rng.randint(0, 255) for _ in range(constants.FIELD_LENGTH)] for _ in range(SAMPLE_CNT)]
+        expected = _scalarValues(_scalarDriver(calibration, variant), regs_list)
+        if expected is None:
+            with pytest.raises(ZeroDivisionError):
+                bme680_batch.compensateFieldData(calibration, regs_list, variant)
+            continue
+        values = bme680_batch.compensateFieldData(calibration, regs_list, variant)
+        assert list(zip(values['temperature'].tolist(), values['pressure'].tolist(),
+            values['humidity'].tolist(), values['gas_resistance'].tolist())) == expected
+
+
+def test_compensate_matches_calc():
+    rng = random.Random(0)
+    for _ in range(CALIBRATION_CNT):
+        calibration = _randomCalibration(rng)
+        bme680 = _scalarDriver(calibration, constants.VARIANT_LOW)
+        adc_temp = [rng.randint(0, 2**20 - 1) for _ in range(SAMPLE_CNT)]
+        adc_pres = [rng.randint(0, 2**20 - 1) for _ in range(SAMPLE_CNT)]
+        adc_hum = [rng.randint(0, 65535) for _ in range(SAMPLE_CNT)]
+        adc_gas_res = [rng.randint(0, 1023) for _ in range(SAMPLE_CNT)]
+        gas_range = [rng.randint(0, 15) for _ in range(SAMPLE_CNT)]
+        expected = []
+        for i in range(SAMPLE_CNT):
+            expected.append((
+                bme680._calc_temperature(adc_temp[i]) / 100.0,
+                bme680._calc_pressure(adc_pres[i]) / 100.0,
+                bme680._calc_humidity(adc_hum[i]) / 1000.0,
+                bme680._calc_gas_resistance_low(adc_gas_res[i], gas_range[i]),
+                ))
+        values = bme680_batch.compensate(calibration, adc_temp, adc_pres, adc_hum, adc_gas_res, gas_range)
+        assert list(zip(values['temperature'].tolist(), values['pressure'].tolist(),
+            values['humidity'].tolist(), values['gas_resistance'].tolist())) == expected
+
+
+def test_zero_divisor_raises_as_driver():
+    calibration = _randomCalibration(random.Random(0))
+    calibration.par_p1 = 0
+    with pytest.raises(ZeroDivisionError):
+        _scalarDriver(calibration, constants.VARIANT_LOW)._calc_pressure(400000)
+    with pytest.raises(ZeroDivisionError):
+        bme680_batch.compensate(calibration, [500000], [400000], [20000], [500], [5])
+
+
+def test_overflow_rows_are_exact():
+    # Pressure of some of these raw values passes int64 in the formulas with this calibration
+    calibration = _randomCalibration(random.Random(0))
+    bme680 = _scalarDriver(calibration, constants.VARIANT_LOW)
+    adc_temp = np.arange(0, 2**20, 4099)
+    adc_pres = np.arange(0, 2**20, 4099)
+    expected = []
+    for temperature_adc, pressure_adc in zip(adc_temp.tolist(), adc_pres.tolist()):
+        bme680._calc_temperature(temperature_adc)
+        expected.append(bme680._calc_pressure(pressure_adc))
+    _, t_fine = bme680_batch.calcTemperature(calibration, adc_temp)
+    pressure = bme680_batch.calcPressure(calibration, adc_pres, t_fine)
+    # Computed again with Python ints
+    assert pressure.dtype == object
+    assert pressure.tolist() == expected
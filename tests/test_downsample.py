@@ -0,0 +1,71 @@
+"""
+Downsampling of monitor.downsample, against reference implementations
+"""
+
+import numpy as np
+import pytest
+
+from monitor.downsample import lttb, minMax
+
+
+# Largest-Triangle-Three-Buckets as in the thesis of Sveinn Steinarsson, point by point.
+# Bucket edges are floor(i * every) + 1, in integers not to round every
+def lttbReference(x, y, points):
+    n = len(x)
+    if points >= n or points < 3:
+        return list(range(n))
+    edge_list = [i * (n - 2) // (points - 2) + 1 for i in range(points - 1)] + [n]
+
+    index_list = [0]
+    a = 0
+    for i in range(points - 2):
+        # Mean of the next bucket, the last point for the last bucket
+        next_start, next_end = edge_list[i + 1], edge_list[i + 2]
+        mean_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        mean_y = sum(y[next_start:next_end]) / (next_end - next_start)
+
+        max_area = -1
+        for j in range(edge_list[i], edge_list[i + 1]):
+            area = abs((x[a] - mean_x) * (y[j] - y[a]) - (x[a] - x[j]) * (mean_y - y[a]))
+            if area > max_area:
+                max_area = area
+                next_a = j
+        index_list.append(next_a)
+        a = next_a
+    index_list.append(n - 1)
+    return index_list
+
+
+@pytest.mark.parametrize('n, points', [(10, 3), (100, 10), (1000, 37), (1001, 1000), (5000, 500)])
+def test_lttb_matches_reference(n, points):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.uniform(.5, 1.5, n))
+    y = np.cumsum(rng.normal(size=n))
+    assert lttb(x, y, points).tolist() == lttbReference(x.tolist(), y.tolist(), points)
+
+
+def test_lttb_keeps_all_when_not_reduced():
+    assert lttb([0, 1, 2], [0, 1, 0], 3).tolist() == [0, 1, 2]
+    assert lttb([0, 1, 2, 3], [0, 1, 0, 1], 2).tolist() == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('n, points', [(10, 4), (100, 10), (1000, 37), (1001, 1000), (5000, 500)])
+def test_minMax_keeps_extremes_of_every_bucket(n, points):
+    rng = np.random.default_rng(n)
+    # Integers, so that buckets have ties
+    y = rng.integers(0, 20, n)
+    index = minMax(np.arange(n), y, points)
+    assert len(index) <= points
+    assert np.all(np.diff(index) > 0)
+
+    bucket_cnt = points // 2
+    edge_list = [-(-i * n // bucket_cnt) for i in range(bucket_cnt)] + [n]
+    index_set = set(index.tolist())
+    for start, end in zip(edge_list, edge_list[1:]):
+        kept_list = [y[i] for i in index_set if start <= i < end]
+        assert min(kept_list) == y[start:end].min()
+        assert max(kept_list) == y[start:end].max()
+
+
+def test_minMax_keeps_all_when_not_reduced():
+    assert minMax(None, [3, 1, 2], 3).tolist() == [0, 1, 2]
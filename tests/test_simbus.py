@@ -0,0 +1,321 @@
+"""
+Regression tests of the collector, on simulated I2C buses of devices.simbus
+"""
+
+import asyncio, time
+from types import SimpleNamespace
+
+import pytest
+
+from devices.bme680_example import BME680
+from devices.simbus import SimBackend
+from helpers import scheduler as scheduler_module
+from helpers.capture import CaptureWriter
+from helpers.capturereader import readCapture
+from helpers.collector import BusPoller, collectCycle, collectCycleAsync
+from helpers.lineprotocol import LineProtocolSerializer
+from helpers.ringbuffer import RingReader, RingWriter
+from helpers.scheduler import Scheduler
+from helpers.sensors import createSensor
+from helpers.spool import Spool
+
+
+CONFIG = {
+        'devices': [
+            {'name': 'AHT21', 'bus': 1, 'address': '0x38'},
+            {'name': 'BME680', 'bus': 2, 'address': '0x77'},
+            {'name': 'MCP9808', 'bus': 1, 'address': '0x18'},
+            {'name': 'CCS811', 'bus': 2, 'address': '0x5a'},
+            ]
+        }
+
+BME680_SETTINGS = {
+        'os_hum': 2, 'os_pres': 3, 'os_temp': 4, 'filter_size': 2, 'gas_status': 1,
+        'heater_temperature': 320, 'heater_duration': 150, 'nb_profile': 0,
+        }
+
+
+@pytest.fixture
+def backend():
+    return SimBackend.fromConfig(CONFIG)
+
+
+@pytest.fixture
+def sensor_list(backend):
+    return [createSensor(config_device, backend) for config_device in CONFIG['devices']]
+
+
+# -------------------------
+# Collector
+def test_collectCycle_keeps_sensor_order(sensor_list):
+    result_list = collectCycle(sensor_list)
+    assert [result['name'] for result in result_list] == ['AHT21', 'BME680', 'MCP9808', 'CCS811']
+    assert result_list[0]['measures'] == {'humidity': 50.0, 'temperature': 24.0}
+    assert result_list[2]['measures'] == {'temperature': 25.0}
+    assert result_list[3]['measures'] == {'eTVOC': 10}
+
+
+def test_BusPoller_merges_buses_in_sensor_order(sensor_list):
+    poller = BusPoller(sensor_list)
+    try:
+        assert poller.bus_list == [1, 2]
+        cycle = poller.collect()
+        assert [result['name'] for result in cycle['results']] == ['AHT21', 'BME680', 'MCP9808', 'CCS811']
+
+        # Only the given sensors, in their order
+        cycle = poller.collect([sensor_list[3], sensor_list[0]])
+        assert [result['name'] for result in cycle['results']] == ['CCS811', 'AHT21']
+    finally:
+        poller.close()
+
+
+# Measure sensor by collectCycleAsync, and return its measures
+# and the longest time the event loop did not run meanwhile
+def _measureTicking(sensor):
+    async def main():
+        cycle_task = asyncio.ensure_future(collectCycleAsync([sensor]))
+        tick_list = [time.monotonic()]
+        while not cycle_task.done():
+            await asyncio.sleep(.01)
+            tick_list.append(time.monotonic())
+        return cycle_task.result(), max(b - a for a, b in zip(tick_list, tick_list[1:]))
+
+    cycle, max_gap = asyncio.run(main())
+    return cycle['results'][0]['measures'], max_gap
+
+
+def test_CCS811_does_not_block_event_loop(sensor_list):
+    ccs811 = sensor_list[3]._ccs811
+    getECO2ETVOC = ccs811.getECO2ETVOC
+    # As the recovery of interpretStatus, which sleeps
+    def getECO2ETVOCSlowly():
+        time.sleep(.2)
+        return getECO2ETVOC()
+    ccs811.getECO2ETVOC = getECO2ETVOCSlowly
+
+    measures, max_gap = _measureTicking(sensor_list[3])
+    assert measures == {'eTVOC': 10}
+    assert max_gap < .1
+
+
+@pytest.mark.parametrize('name', ['AHT10', 'AHT21'])
+def test_AHT_recovery_does_not_block_event_loop(name):
+    config_device = {'name': name, 'bus': 1}
+    backend = SimBackend.fromConfig({'devices': [config_device]})
+    sensor = createSensor(config_device, backend)
+    # Calibration is lost, so the driver initializes or resets the device, sleeping .1 s
+    chip = backend.getBus(1).getChip(0x38)
+    chip._status = 0x00
+
+    measures, max_gap = _measureTicking(sensor)
+    assert measures == {'humidity': -1, 'temperature': -1}
+    assert chip._status == 0x18
+    assert max_gap < .08
+
+
+BME680_FAILED = {'humidity': -1, 'temperature': -1, 'pressure': -1, 'iaq': -1}
+
+
+def test_BME680_fault_does_not_stop_cycle(backend, sensor_list):
+    bus = backend.getBus(2)
+    poller = BusPoller(sensor_list)
+    try:
+        # The trigger of BME680 fails
+        bus.failNext()
+        cycle = poller.collect()
+    finally:
+        poller.close()
+    measures_dict = {result['name']: result['measures'] for result in cycle['results']}
+    assert measures_dict['BME680'] == BME680_FAILED
+    assert measures_dict['AHT21'] == {'humidity': 50.0, 'temperature': 24.0}
+    assert measures_dict['MCP9808'] == {'temperature': 25.0}
+    assert measures_dict['CCS811'] == {'eTVOC': 10}
+    assert bus.error_cnt == 1
+
+    # The next cycle measures again
+    assert collectCycle(sensor_list)[1]['measures']['temperature'] == 25.0
+
+
+def test_BME680_read_fault(backend, sensor_list):
+    bme680 = sensor_list[1]
+    bus = backend.getBus(2)
+    for collect, failed in [(bme680.collect, BME680_FAILED), (bme680.collectRaw, None)]:
+        bme680.trigger()
+        bus.failNext()
+        assert collect() == failed
+    bus.failNext()
+    assert asyncio.run(bme680.measureAsync()) == BME680_FAILED
+
+
+# -------------------------
+# Scheduler
+def test_Scheduler_due_and_skip(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scheduler_module.time, 'monotonic', lambda: now[0])
+    fast = SimpleNamespace(interval=1.0)
+    slow = SimpleNamespace(interval=None)
+    scheduler = Scheduler([fast, slow], default_interval=2.0)
+
+    assert scheduler.popDue() == [fast, slow]
+    assert scheduler.getSleepSecond() == 1.0
+
+    now[0] = 101.0
+    assert scheduler.popDue() == [fast]
+    assert scheduler.popDue() == []
+
+    # fast was due at 102, and its slot at 103 is passed too
+    now[0] = 103.5
+    assert scheduler.popDue() == [fast, slow]
+    stats = scheduler.getStats()
+    assert stats['skipped'] == 1
+    assert stats['late'] == 2
+    assert stats['jitter']['count'] == 5
+    assert stats['jitter']['max'] == 1.5
+    # Next due times stay on the grid: fast at 104, slow at 104
+    assert scheduler.getSleepSecond() == 0.5
+
+    # Overrun when the next due time has passed
+    now[0] = 104.25
+    assert scheduler.getSleepSecond() == 0
+    assert scheduler.getStats()['overrun']['count'] == 1
+
+    scheduler.resetStats()
+    assert scheduler.getStats()['skipped'] == 0
+
+
+# -------------------------
+# Line protocol
+def test_LineProtocolSerializer_escapes_and_skips():
+    serializer = LineProtocolSerializer(tag_dict={'host name': 'pi,1'})
+    data = serializer.serialize([
+        {'name': 'My Sensor,1', 'time': 123, 'measures': {
+            'temp rature': 25.5, 'a=b': 3, 'ok': True, 'label': 'say "hi"\\', 'failed': -1,
+            'nan': float('nan'),
+            }},
+        {'name': 'All failed', 'time': 124, 'measures': {'temperature': -1}},
+        ])
+    assert data == (b'My\\ Sensor\\,1,host\\ name=pi\\,1 '
+            b'temp\\ rature=25.5,a\\=b=3i,ok=true,label="say \\"hi\\"\\\\" 123\n')
+    # The buffer is reused, not copied
+    assert serializer.serialize([{'name': 'A', 'measures': {'x': 1}}]) is data
+    assert data == b'A,host\\ name=pi\\,1 x=1i\n'
+
+
+# -------------------------
+# Spool
+def test_Spool_round_trip(tmp_path):
+    filename = str(tmp_path / 'spool.sqlite3')
+    spool = Spool(filename, max_size=3)
+    result_list = [{'name': 'AHT21', 'time': i, 'measures': {'temperature': 20.0 + i}} for i in range(4)]
+    assert spool.put(result_list[:2]) == 0
+    # The oldest is dropped over max_size
+    assert spool.put(result_list[2:]) == 1
+    assert len(spool) == 3
+
+    batch = spool.peek(2)
+    assert [result for _, result in batch] == result_list[1:3]
+    spool.remove(batch[-1][0])
+    spool.close()
+
+    # Results are kept in the file
+    spool = Spool(filename)
+    assert len(spool) == 1
+    assert [result for _, result in spool.peek(10)] == result_list[3:]
+    spool.close()
+
+
+# -------------------------
+# Ring buffer
+def test_RingWriter_RingReader_round_trip(tmp_path):
+    filename = str(tmp_path / 'i2c.ring')
+    writer = RingWriter(filename, slot_count=8, key_max=4)
+    reader = RingReader(filename)
+
+    writer.write([
+        {'name': 'AHT21', 'time': 1, 'measures': {'humidity': 50.0, 'temperature': -1}},
+        {'name': 'MCP9808', 'time': 2, 'measures': {'temperature': 25.0}},
+        ])
+    reading_list, seq = reader.readSince(0)
+    assert reading_list == [(1, 1, 'AHT21', 'humidity', 50.0), (2, 2, 'MCP9808', 'temperature', 25.0)]
+    assert seq == 2
+
+    # Only the last slot_count readings are kept
+    for i in range(10):
+        writer.write([{'name': 'MCP9808', 'time': 10 + i, 'measures': {'temperature': float(i)}}])
+    reading_list, seq = reader.readSince(seq)
+    assert seq == 12
+    assert [reading[0] for reading in reading_list] == list(range(5, 13))
+    # The reading of AHT21 is overwritten
+    assert reader.getLatest() == {'MCP9808': {'temperature': (19, 9.0)}}
+
+    # A restarted writer continues the sequence numbers
+    writer.close()
+    writer = RingWriter(filename, slot_count=8, key_max=4)
+    writer.write([{'name': 'AHT21', 'time': 20, 'measures': {'humidity': 40.0}}])
+    assert reader.readSince(seq) == ([(13, 20, 'AHT21', 'humidity', 40.0)], 13)
+    writer.close()
+    reader.close()
+
+
+# -------------------------
+# Raw capture
+def test_capture_decodes_as_driver(backend, sensor_list, tmp_path):
+    # New CCS811 data at every read, so both cycles have it
+    backend.getBus(2).getChip(0x5a).SAMPLE_SECOND = 0
+    filename = str(tmp_path / 'i2c.raw')
+    writer = CaptureWriter(filename, sensor_list)
+    expected_list = []
+    for temperature, humidity in [(25.0, 50.0), (18.5, 35.0), (30.25, 70.0)]:
+        backend.environment['temperature'] = temperature
+        backend.environment['humidity'] = humidity
+        expected_list.append({result['name']: result['measures'] for result in collectCycle(sensor_list)})
+        writer.write(collectCycle(sensor_list, is_raw=True))
+    writer.close()
+
+    result_dict = readCapture(filename)
+    for i, expected in enumerate(expected_list):
+        for name in ['AHT21', 'MCP9808', 'CCS811']:
+            for field, value in expected[name].items():
+                assert value != -1
+                assert result_dict[name][field][i] == value
+        for field in ['temperature', 'pressure', 'humidity']:
+            assert result_dict['BME680'][field][i] == expected['BME680'][field]
+
+    # Appended only with the same devices
+    with pytest.raises(ValueError):
+        CaptureWriter(filename, sensor_list[:2])
+
+
+# -------------------------
+# BME680
+def test_BME680_warm_start(backend):
+    bus = backend.getBus(2)
+    bme680 = BME680(0x77, backend.getSMBus(2), settings=BME680_SETTINGS)
+    assert not bme680.is_warm_start
+    cold_transaction_cnt = bus.transaction_cnt
+
+    # Settings held by the device are not written again
+    bus.resetCounters()
+    bme680 = BME680(0x77, backend.getSMBus(2), settings=BME680_SETTINGS)
+    assert bme680.is_warm_start
+    assert (cold_transaction_cnt, bus.transaction_cnt) == (8, 6)
+
+    # Other settings reset and configure the device again
+    bme680 = BME680(0x77, backend.getSMBus(2), settings={**BME680_SETTINGS, 'heater_temperature': 300})
+    assert not bme680.is_warm_start
+
+
+def test_capture_keeps_devices_of_the_same_name(tmp_path):
+    config = {'devices': [{'name': 'AHT21', 'bus': 1}, {'name': 'AHT21', 'bus': 3}]}
+    backend = SimBackend.fromConfig(config)
+    sensor_list = [createSensor(config_device, backend) for config_device in config['devices']]
+    filename = str(tmp_path / 'i2c.raw')
+    writer = CaptureWriter(filename, sensor_list)
+    # Trigger and read of the AHT21 on bus 3 fail
+    backend.getBus(3).failNext(2)
+    writer.write(collectCycle(sensor_list, is_raw=True))
+    writer.close()
+
+    result_dict = readCapture(filename)
+    assert result_dict['AHT21[0]']['temperature'].tolist() == [24.0]
+    assert result_dict['AHT21[1]']['temperature'].tolist() == [-1]
@@ -0,0 +1,39 @@
+"""
+Trace file of devices.tracing
+"""
+
+import json
+
+from devices import tracing
+from devices.tracing import TraceRecorder
+
+
+def _getLineCount(filename):
+    with open(filename) as trace_file:
+        return sum(1 for line in trace_file)
+
+
+def test_TraceRecorder_flushes_and_rotates(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, 'FLUSH_LINE_COUNT', 10)
+    filename = str(tmp_path / 'i2c.trace')
+    recorder = TraceRecorder(filename, max_bytes=2000, backup_count=2)
+
+    # Flushed by line count, without waiting for FLUSH_SECOND
+    for _ in range(10):
+        recorder.record('AHT21', 'read', 7, 100000, False)
+    assert _getLineCount(filename) == 10
+    with open(filename) as trace_file:
+        assert json.loads(trace_file.readline())['device'] == 'AHT21'
+
+    # Rotated over max_bytes, and only backup_count old files are kept
+    for _ in range(100):
+        recorder.record('AHT21', 'read', 7, 100000, False)
+    assert (tmp_path / 'i2c.trace.1').exists()
+    assert (tmp_path / 'i2c.trace.2').exists()
+    assert not (tmp_path / 'i2c.trace.3').exists()
+
+    # Lines not flushed yet are written on close
+    recorder.record('MCP9808', 'writeread', 3, 100000, True)
+    recorder.close()
+    with open(filename) as trace_file:
+        assert json.loads(trace_file.readlines()[-1])['device'] == 'MCP9808'
@@ -0,0 +1,121 @@
+"""
+Batching, retries and backoff of helpers.uploader, with a fake client
+"""
+
+import threading, time
+
+from helpers import uploader as uploader_module
+from helpers.uploader import MemoryQueue, Uploader
+
+
+class FakeClient:
+    """
+    writeResults fails fail_cnt times, then succeeds
+    """
+    def __init__(self, fail_cnt=0):
+        self.fail_cnt = fail_cnt
+        self.call_list = []
+        self.uploaded_list = []
+        self.event = threading.Event()
+
+    def writeResults(self, result_list):
+        self.call_list.append(list(result_list))
+        self.event.set()
+        if self.fail_cnt > 0:
+            self.fail_cnt -= 1
+            return False
+        self.uploaded_list += result_list
+        return True
+
+
+def _getResults(start, stop):
+    return [{'name': 'AHT21', 'time': i, 'measures': {'temperature': 20.0}} for i in range(start, stop)]
+
+
+# Wait until condition() is true, for at most timeout second
+def _waitUntil(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(.005)
+
+
+def test_Uploader_retries_failed_batch():
+    client = FakeClient(fail_cnt=2)
+    uploader = Uploader(client, flush_size=3, flush_second=.01, backoff_second=.01)
+    uploader.start()
+    try:
+        uploader.put(_getResults(0, 3))
+        _waitUntil(lambda: uploader.uploaded_cnt == 3)
+    finally:
+        uploader.close()
+    # The same batch is sent until it is uploaded
+    assert client.call_list == [_getResults(0, 3)] * 3
+    assert client.uploaded_list == _getResults(0, 3)
+    assert uploader.error_cnt == 2
+    assert uploader.queue_size == 0
+
+
+def test_Uploader_backoff_grows_to_max(monkeypatch):
+    uniform_list = []
+    monkeypatch.setattr(uploader_module.random, 'uniform', lambda a, b: uniform_list.append((a, b)) or b)
+    # Not started, so _backoff does not wait
+    uploader = Uploader(FakeClient(), backoff_second=1.0, max_backoff_second=5.0)
+    for retry_cnt in range(5):
+        uploader._backoff(retry_cnt)
+    assert uniform_list == [(.5, 1.0), (1.0, 2.0), (2.0, 4.0), (2.5, 5.0), (2.5, 5.0)]
+
+
+def test_Uploader_flushes_at_flush_size():
+    client = FakeClient()
+    uploader = Uploader(client, flush_size=3, flush_second=60.0)
+    uploader.start()
+    try:
+        uploader.put(_getResults(0, 2))
+        assert not client.event.wait(.1)
+        # Uploaded at once, long before flush_second
+        uploader.put(_getResults(2, 3))
+        assert client.event.wait(1.0)
+        _waitUntil(lambda: uploader.uploaded_cnt == 3)
+    finally:
+        uploader.close()
+    assert client.call_list == [_getResults(0, 3)]
+
+
+def test_Uploader_flushes_every_flush_second():
+    client = FakeClient()
+    uploader = Uploader(client, flush_size=100, flush_second=.05)
+    uploader.start()
+    try:
+        uploader.put(_getResults(0, 2))
+        _waitUntil(lambda: uploader.uploaded_cnt == 2)
+    finally:
+        uploader.close()
+    assert client.call_list == [_getResults(0, 2)]
+
+
+def test_Uploader_leaves_results_on_close():
+    client = FakeClient(fail_cnt=10**6)
+    uploader = Uploader(client, flush_size=100, flush_second=60.0, backoff_second=60.0)
+    uploader.start()
+    uploader.put(_getResults(0, 5))
+    start = time.monotonic()
+    # One last flush, which fails, then the thread ends without waiting for backoff
+    uploader.close(timeout=2.0)
+    assert time.monotonic() - start < 1.0
+    assert not uploader._thread.is_alive()
+    assert uploader.queue_size == 5
+    assert uploader.uploaded_cnt == 0
+
+
+def test_MemoryQueue_drops_oldest():
+    queue = MemoryQueue(max_size=3)
+    assert queue.put(_getResults(0, 2)) == 0
+    assert queue.put(_getResults(2, 5)) == 2
+    assert [result for _, result in queue.peek(10)] == _getResults(2, 5)
+
+    # Counted by the uploader
+    uploader = Uploader(FakeClient(), queue=MemoryQueue(max_size=3), flush_size=100)
+    uploader.put(_getResults(0, 5))
+    assert uploader.dropped_cnt == 2
+    assert uploader.queue_size == 3
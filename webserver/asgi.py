@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webserver.settings')
 
 application = get_asgi_application()
+
+# Live readings of the dashboards, imported after Django is set up
+from monitor.stream import StreamApplication
+application = StreamApplication(application)